@@ -0,0 +1,79 @@
+import re
+from typing import Dict, List, Optional, Union
+
+from morph_cache import MorphAnalysis, MorphCache
+from token_store import TokenTable
+
+
+PUNCTUATION_MARKS = frozenset({'?', '!', '.', ',', ';', ':', '"', "'", '»', '«', '(', ')'})
+
+
+def index_tokens(tokens: List[str]) -> Dict[str, List[int]]:
+    """Позиции каждого токена в нижнем регистре, по возрастанию"""
+    positions: Dict[str, List[int]] = {}
+    for i, token in enumerate(tokens):
+        positions.setdefault(token.lower(), []).append(i)
+    return positions
+
+
+def first_position_after(positions: Dict[str, List[int]], words, after: int = -1) -> Optional[int]:
+    """Первая позиция любого из words (в нижнем регистре) правее after"""
+    found = [p for word in words for p in positions.get(word, ()) if p > after]
+    return min(found) if found else None
+
+
+class SentenceAnalysisContext:
+    """Контекст анализа одного предложения
+
+    Строится один раз на предложение: хранит документ Stanza, его разбор,
+    список токенов, морфологические разборы и переводы слов. Все этапы
+    конвейера читают данные отсюда и ничего не пересчитывают.
+    """
+
+    def __init__(self, sentence: str, stanza_doc=None, stanza_analysis: Optional[Union[TokenTable, Dict]] = None,
+                 morph_cache: Optional[MorphCache] = None):
+        self.sentence = sentence.strip()
+        self.morph_cache = morph_cache
+        self.morph_parses: Dict[str, MorphAnalysis] = {}
+        self.translations: Dict[str, str] = {}
+        self.pattern: Optional[str] = None
+        # Шаблоны, чьи триггеры найдены в предложении (по убыванию приоритета)
+        self.triggers: Optional[List[str]] = None
+        # Каким путём разобрано предложение: "stanza" или "morph" (см. AnalysisRouter)
+        self.analysis_path: Optional[str] = None
+        self.set_stanza_analysis(stanza_doc, stanza_analysis)
+
+    def set_stanza_analysis(self, stanza_doc, stanza_analysis: Optional[Union[TokenTable, Dict]]):
+        """Задаёт разбор Stanza и заново строит токены и их позиции"""
+        self.stanza_doc = stanza_doc
+        self.stanza_analysis = stanza_analysis
+        self.tokens: List[str] = self._extract_tokens()
+        # Позиции токенов: первая позиция точной формы и все позиции формы в нижнем регистре
+        self.positions: Dict[str, int] = {}
+        self.lower_positions: Dict[str, List[int]] = index_tokens(self.tokens)
+        for i, token in enumerate(self.tokens):
+            self.positions.setdefault(token, i)
+
+    @property
+    def stanza_ok(self) -> bool:
+        return self.stanza_analysis is not None and "error" not in self.stanza_analysis
+
+    def _extract_tokens(self) -> List[str]:
+        if self.stanza_ok:
+            words = self.stanza_analysis.texts
+        else:
+            clean = re.sub(r'[^\w\s]', ' ', self.sentence)
+            words = [w for w in clean.strip().split() if w]
+        return [w for w in words if w not in PUNCTUATION_MARKS]
+
+    def analyze(self, word: str) -> MorphAnalysis:
+        """Морфологический разбор слова из общего кэша, запоминается для предложения"""
+        analysis = self.morph_parses.get(word)
+        if analysis is None:
+            # Контекст мог быть построен до загрузки pymorphy2 — тогда разбор пустой
+            if self.morph_cache is None:
+                analysis = MorphAnalysis(word, [])
+            else:
+                analysis = self.morph_cache.analyze(word)
+            self.morph_parses[word] = analysis
+        return analysis
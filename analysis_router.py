@@ -0,0 +1,110 @@
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from analysis_context import SentenceAnalysisContext
+
+
+ANALYSIS_MODES = ("stanza", "adaptive", "morph")
+
+# Слова, которые резервный анализ узнаёт без синтаксиса
+PRONOUNS = frozenset({'я', 'ты', 'он', 'она', 'оно', 'мы', 'вы', 'они'})
+QUESTION_WORDS = frozenset({'что', 'кто', 'где', 'когда', 'почему', 'как', 'сколько'})
+# Союзы и знаки, после которых в предложении, скорее всего, больше одной клаузы
+CLAUSE_MARKERS = frozenset({'и', 'а', 'но', 'или', 'что', 'чтобы', 'который', 'которая', 'которое', 'которые',
+                            'когда', 'если', 'потому', 'пока', 'хотя'})
+CLAUSE_PUNCTUATION = (',', ';', ':', '—')
+# Части речи pymorphy2, которые резервный анализ может взять в дополнение
+OBJECT_POS = frozenset({'NOUN', 'NPRO'})
+
+
+class AnalysisRouter:
+    """Выбор анализатора для предложения: морфологический разбор или Stanza
+
+    Режимы: "stanza" — всегда полный конвейер Stanza (как раньше), "morph" —
+    никогда, "adaptive" — сначала дешёвая оценка по pymorphy2. Короткое
+    предложение из одной клаузы с одним глаголом, местоимением-подлежащим
+    перед ним и существительным сразу после глагола резервный анализ
+    разбирает так же, как Stanza; его уверенность — произведение
+    pos_confidence слов. Остальные предложения передаются Stanza.
+    """
+
+    def __init__(self, mode: str = "stanza", max_words: int = 6, min_confidence: float = 0.75):
+        if mode not in ANALYSIS_MODES:
+            raise ValueError(f"Неизвестный режим анализа: {mode} (допустимы: {', '.join(ANALYSIS_MODES)})")
+        self.mode = mode
+        self.max_words = max_words
+        self.min_confidence = min_confidence
+        self.paths: Dict[str, int] = {"stanza": 0, "morph": 0}
+        # Почему предложение передано Stanza в адаптивном режиме
+        self.reasons: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def assess(self, context: SentenceAnalysisContext,
+               is_verb: Callable[[str], bool]) -> Tuple[float, Optional[str]]:
+        """Уверенность резервного анализа и причина, по которой он не подходит
+
+        is_verb — тот же признак глагола, которым пользуется резервный анализ.
+        """
+        tokens = context.tokens
+        if context.morph_cache is None:
+            return 0.0, "no_morph"
+        if len(tokens) > self.max_words:
+            return 0.0, "long"
+        if any(mark in context.sentence for mark in CLAUSE_PUNCTUATION):
+            return 0.0, "clauses"
+
+        confidence = 1.0
+        verb_index = None
+        has_subject = False
+        for i, token in enumerate(tokens):
+            lower = token.lower()
+            if i and lower in CLAUSE_MARKERS:
+                return 0.0, "clauses"
+            analysis = context.analyze(token)
+            if is_verb(token):
+                if verb_index is not None:
+                    return 0.0, "verbs"
+                verb_index = i
+            elif verb_index is None:
+                if lower in PRONOUNS:
+                    has_subject = True
+                elif lower not in QUESTION_WORDS:
+                    # Подлежащее-существительное резервный анализ не находит
+                    return 0.0, "subject"
+            confidence *= analysis.pos_confidence
+        if verb_index is None:
+            return 0.0, "verbs"
+        if not has_subject:
+            # Без местоимения перед глаголом подлежащим может оказаться слово после него
+            return 0.0, "subject"
+        if verb_index + 1 < len(tokens):
+            following = context.analyze(tokens[verb_index + 1])
+            if following.pos not in OBJECT_POS:
+                return 0.0, "object"
+        if confidence < self.min_confidence:
+            return confidence, "ambiguous"
+        return confidence, None
+
+    def needs_stanza(self, context: SentenceAnalysisContext, is_verb: Callable[[str], bool]) -> bool:
+        """Решает, нужен ли предложению разбор Stanza, и учитывает выбранный путь"""
+        reason = None
+        if self.mode == "stanza":
+            use_stanza = True
+        elif self.mode == "morph":
+            use_stanza = False
+        else:
+            _, reason = self.assess(context, is_verb)
+            use_stanza = reason is not None
+        self.record(context, "stanza" if use_stanza else "morph", reason)
+        return use_stanza
+
+    def record(self, context: SentenceAnalysisContext, path: str, reason: Optional[str] = None):
+        context.analysis_path = path
+        with self._lock:
+            self.paths[path] += 1
+            if reason is not None:
+                self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"mode": self.mode, "paths": dict(self.paths), "escalations": dict(self.reasons)}
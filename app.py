@@ -1,20 +1,46 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, filedialog
 import random
 import sys
 import os
 import json
-from threading import Thread
+import csv
+from threading import Event, Thread
+from concurrent.futures import ThreadPoolExecutor
 import queue
 import re
+import time
+from itertools import chain, islice
 from typing import Dict, List, Tuple, Optional
 
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 
+class BatchJob:
+    """Пакетный перевод файла: предложения, готовые результаты и флаг отмены"""
+
+    def __init__(self, path: str, sentences: List[str]):
+        self.path = path
+        self.sentences = sentences
+        self.results: List[Dict] = []
+        self.cancel = Event()
+        self.finished = False
+        self.error: Optional[str] = None
+        self.started = time.perf_counter()
+
+
 class TranslationApp:
+    # Пауза в наборе, после которой запускается перевод при вводе (мс)
+    DEBOUNCE_MS = 300
+    # Предложений в одной задаче пакетного перевода: между задачами
+    # успевают выполняться интерактивные переводы
+    BATCH_CHUNK = 64
+    # Как часто проверять, не изменился ли файл правил (с)
+    RULES_POLL_SECONDS = 2.0
+
     def __init__(self, root):
+        self.started_at = time.perf_counter()
         self.root = root
         self.root.title("Transformational Russian-English Translator")
         self.root.geometry("1200x800")
@@ -23,12 +49,30 @@ class TranslationApp:
         # Очередь для межпоточного общения
         self.translation_queue = queue.Queue()
 
+        # Единственный поток перевода; каждый запрос получает номер поколения,
+        # результаты устаревших поколений отбрасываются, а их работа прерывается
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="translator")
+        # Задачи, ещё не выполненные потоком перевода (отменяются при закрытии окна)
+        self._futures = set()
+        self.generation = 0
+        self.cancel_event = Event()
+        self.submitted_text = None
+        self._debounce_job = None
+        self.batch_job: Optional[BatchJob] = None
+        # Перезагрузка правил идёт в фоне; окно узнаёт о ней по событию
+        self.rules_watcher = None
+        self.rules_reloaded = Event()
+        self.rules_changed = False
+
         # Загружаем примеры из JSON или используем встроенные
         self.load_examples()
 
         self.setup_ui()
         self.setup_translator()
 
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(50, self._check_translation_result)
+
     def load_examples(self):
         """Загружаем примеры для перевода из JSON файла или используем встроенные"""
         self.examples = [
@@ -69,9 +113,14 @@ class TranslationApp:
         self.rules_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.rules_frame, text="Правила перевода")
 
+        # Вкладка пакетного перевода
+        self.batch_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.batch_frame, text="Пакетный перевод")
+
         self.setup_translation_tab()
         self.setup_analysis_tab()
         self.setup_rules_tab()
+        self.setup_batch_tab()
 
         # Статус бар
         self.status_var = tk.StringVar(value="Готов к работе")
@@ -133,6 +182,15 @@ class TranslationApp:
             command=self.generate_example
         ).pack(side='left', padx=5)
 
+        self.live_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            button_frame,
+            text="Переводить при вводе",
+            variable=self.live_var,
+            command=self._on_input_changed
+        ).pack(side='left', padx=5)
+        self.input_text.bind('<KeyRelease>', self._on_input_changed)
+
         # Фрейм для результата перевода
         result_frame = ttk.Frame(self.translate_frame)
         result_frame.pack(pady=10, padx=20, fill='both', expand=True)
@@ -263,9 +321,55 @@ class TranslationApp:
         ttk.Button(
             rules_frame,
             text="Обновить правила",
-            command=self.update_rules_display
+            command=self.reload_rules
         ).pack(pady=5)
 
+    def setup_batch_tab(self):
+        """Настройка вкладки пакетного перевода
+
+        Таблица результатов виртуальная: в Treeview всегда не больше строк,
+        чем помещается на экране, а прокрутка лишь меняет смещение в списке
+        результатов. Поэтому десятки тысяч строк не замедляют Tk.
+        """
+        batch_frame = ttk.Frame(self.batch_frame)
+        batch_frame.pack(fill='both', expand=True, padx=10, pady=10)
+
+        ttk.Label(batch_frame, text="Перевод файла (txt — предложение на строку, CSV — колонка text или первая):",
+                  font=('Arial', 11, 'bold')).pack(anchor='w', pady=5)
+
+        button_frame = ttk.Frame(batch_frame)
+        button_frame.pack(fill='x', pady=5)
+        ttk.Button(button_frame, text="Открыть файл...", command=self.load_batch_file,
+                   style='Accent.TButton').pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Остановить", command=self.stop_batch).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Экспорт в JSONL...", command=self.export_batch_results).pack(side='left', padx=5)
+
+        self.batch_progress = ttk.Progressbar(batch_frame, mode='determinate')
+        self.batch_progress.pack(fill='x', pady=5)
+        self.batch_status_var = tk.StringVar(value="Файл не выбран")
+        ttk.Label(batch_frame, textvariable=self.batch_status_var).pack(anchor='w')
+
+        table_frame = ttk.Frame(batch_frame)
+        table_frame.pack(fill='both', expand=True, pady=5)
+        columns = ("index", "original", "translation", "pattern")
+        self.batch_tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=20)
+        for column, title, width in [("index", "№", 60), ("original", "Исходное предложение", 420),
+                                     ("translation", "Перевод", 420), ("pattern", "Шаблон", 100)]:
+            self.batch_tree.heading(column, text=title)
+            self.batch_tree.column(column, width=width, stretch=column in ("original", "translation"))
+        self.batch_scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=self._batch_scroll)
+        self.batch_scrollbar.pack(side='right', fill='y')
+        self.batch_tree.pack(side='left', fill='both', expand=True)
+
+        self.batch_offset = 0
+        self.batch_visible_rows = 20
+        # Пока пользователь не прокрутил таблицу вверх, она следует за новыми результатами
+        self.batch_follow = True
+        self.batch_tree.bind('<Configure>', self._on_batch_resize)
+        self.batch_tree.bind('<MouseWheel>', lambda e: self._batch_scroll('scroll', -3 if e.delta > 0 else 3, 'units'))
+        self.batch_tree.bind('<Button-4>', lambda e: self._batch_scroll('scroll', -3, 'units'))
+        self.batch_tree.bind('<Button-5>', lambda e: self._batch_scroll('scroll', 3, 'units'))
+
     def setup_styles(self):
         """Настройка стилей для виджетов"""
         style = ttk.Style()
@@ -277,12 +381,26 @@ class TranslationApp:
         style.configure('TLabel', background='#f0f0f0')
 
     def setup_translator(self):
-        """Инициализация переводчика"""
+        """Инициализация переводчика
+
+        Правила загружаются сразу, а дисковый кэш переводов, pymorphy2 и
+        Stanza — в фоновом потоке, чтобы окно откликалось без ожидания. До
+        загрузки моделей переводы выполняет упрощённый анализатор.
+        """
         try:
             from main import AdvancedTransformationalTranslator
-            self.translator = AdvancedTransformationalTranslator()
-            self.status_var.set("Трансформационный переводчик готов")
+            from rules_watcher import RulesWatcher
+            self.translator = AdvancedTransformationalTranslator(cache_path=None, load_models=False,
+                                                                 instrument=True)
             self.update_rules_display()
+            # Изменения файла правил применяются без перезапуска и без перезагрузки моделей
+            self.rules_watcher = RulesWatcher(self.translator, self.RULES_POLL_SECONDS,
+                                              on_reload=self._on_rules_reloaded).start()
+            self.status_var.set("Загрузка моделей в фоне... Пока используется упрощённый анализ")
+            thread = Thread(target=self._load_in_background)
+            thread.daemon = True
+            thread.start()
+            self.root.after(200, self._check_models_ready)
         except ImportError as e:
             self.status_var.set(f"Ошибка загрузки переводчика: {e}")
             messagebox.showerror("Ошибка",
@@ -292,6 +410,43 @@ class TranslationApp:
             import traceback
             traceback.print_exc()
 
+    def _load_in_background(self):
+        from translation_cache import DEFAULT_CACHE_PATH
+        # Предзагрузка кэша читает до max_entries строк — не на потоке окна
+        self.translator.init_persistent_cache(DEFAULT_CACHE_PATH)
+        self.translator.load_models()
+
+    def _check_models_ready(self):
+        """Ожидание фоновой загрузки моделей"""
+        if not self.translator.models_ready.is_set():
+            self.root.after(200, self._check_models_ready)
+            return
+        total = time.perf_counter() - self.started_at
+        report = self.translator.startup_report()
+        print(f"Время запуска: {total:.2f} с ({report})")
+        analyzers = []
+        if self.translator.STANZA_AVAILABLE:
+            analyzers.append("Stanza")
+        if self.translator.MORPH_AVAILABLE:
+            analyzers.append("pymorphy2")
+        self.status_var.set(f"Трансформационный переводчик готов "
+                            f"({', '.join(analyzers) or 'упрощённый анализ'}) | запуск {total:.1f} с")
+
+    def reload_rules(self):
+        """Перечитать файл правил в фоне; новые правила действуют для следующих переводов"""
+        if not hasattr(self, 'translator'):
+            self.update_rules_display()
+            return
+        self.status_var.set("Проверка файла правил...")
+        thread = Thread(target=lambda: self._on_rules_reloaded(self.translator.reload_rules()))
+        thread.daemon = True
+        thread.start()
+
+    def _on_rules_reloaded(self, changed: bool = True):
+        """Вызывается в фоновом потоке; окно обновляется опросом"""
+        self.rules_changed = changed
+        self.rules_reloaded.set()
+
     def update_rules_display(self):
         """Обновление отображения правил перевода"""
         self.rules_text.config(state='normal')
@@ -345,19 +500,27 @@ class TranslationApp:
 
         self.rules_text.config(state='disabled')
 
-    def translate_text(self):
-        """Перевод текста в отдельном потоке"""
+    def translate_text(self, live=False):
+        """Перевод текста в потоке переводчика; предыдущий запрос отменяется"""
         text = self.input_text.get('1.0', tk.END).strip()
         if not text:
-            messagebox.showwarning("Внимание", "Введите текст для перевода")
+            if live:
+                # Поле очищено: прерываем текущий перевод и убираем его результат
+                self.generation += 1
+                self.cancel_event.set()
+                self.submitted_text = text
+                self.progress.stop()
+                self.progress.pack_forget()
+                self.output_text.config(state='normal')
+                self.output_text.delete('1.0', tk.END)
+                self.output_text.config(state='disabled')
+            else:
+                messagebox.showwarning("Внимание", "Введите текст для перевода")
             return
 
-        # Проверяем длину текста
-        if len(text) > 200:
-            if not messagebox.askyesno("Подтверждение",
-                                       "Текст слишком длинный для анализа. Перевести только первые 200 символов?"):
-                return
-            text = text[:200]
+        # Текст из нескольких предложений переводится потоком, по предложению
+        from segmentation import iter_sentences
+        streaming = len(list(islice(iter_sentences([text]), 2))) > 1
 
         # Показываем прогресс
         self.progress.pack(side='bottom', fill='x', padx=20, pady=5)
@@ -371,24 +534,55 @@ class TranslationApp:
             widget.delete('1.0', tk.END)
             widget.config(state='disabled')
 
-        self.output_text.config(state='normal')
-        self.output_text.insert('1.0', "Идет перевод...")
-        self.output_text.config(state='disabled')
-
-        # Запускаем в отдельном потоке
-        thread = Thread(target=self._translate_thread, args=(text,))
-        thread.daemon = True
-        thread.start()
-
-        # Проверяем результат каждые 100мс
-        self.root.after(100, self._check_translation_result)
-
-    def _translate_thread(self, text):
-        """Поток для перевода и синтаксического анализа"""
+        if not streaming:
+            self.output_text.config(state='normal')
+            self.output_text.insert('1.0', "Идет перевод...")
+            self.output_text.config(state='disabled')
+
+        # Новое поколение: устаревший перевод прервётся на ближайшей проверке
+        self.generation += 1
+        self.cancel_event.set()
+        self.cancel_event = Event()
+        self.submitted_text = text
+        worker = self._translate_stream_thread if streaming else self._translate_thread
+        self._submit(worker, text, self.generation, self.cancel_event)
+
+    def _submit(self, fn, *args):
+        """Отправляет задачу в поток перевода и помнит её до завершения"""
+        future = self.executor.submit(fn, *args)
+        self._futures.add(future)
+        future.add_done_callback(self._futures.discard)
+        return future
+
+    def _on_input_changed(self, event=None):
+        """Перевод при вводе: запускается после паузы в наборе"""
+        if not self.live_var.get():
+            return
+        if self._debounce_job is not None:
+            self.root.after_cancel(self._debounce_job)
+        self._debounce_job = self.root.after(self.DEBOUNCE_MS, self._translate_live)
+
+    def _translate_live(self):
+        self._debounce_job = None
+        # Клавиши, не изменившие текст (стрелки, Enter после перевода), не запускают перевод
+        if self.input_text.get('1.0', tk.END).strip() != self.submitted_text:
+            self.translate_text(live=True)
+
+    def _translate_thread(self, text, generation, cancel):
+        """Перевод и синтаксический анализ одного предложения
+
+        Устаревший перевод прерывается на границе ближайшего этапа; начатый
+        вызов Stanza или запрос к бэкенду доходит до конца.
+        """
+        # Запрос устарел, пока ждал в очереди
+        if cancel.is_set():
+            return
         try:
             if hasattr(self, 'translator'):
                 # Получаем полный результат перевода
-                result = self.translator.translate_with_analysis(text)
+                result = self.translator.translate_with_analysis(text, cancel=cancel)
+                if cancel.is_set():
+                    return
 
                 # Строим детальный анализ для отображения
                 detailed_analysis = self._build_sentence_analysis(result)
@@ -413,6 +607,9 @@ class TranslationApp:
                     'error': "Translator not loaded"
                 }
         except Exception as e:
+            # Перевод прерван новым запросом (TranslationCancelled) — показывать нечего
+            if cancel.is_set():
+                return
             import traceback
             error_trace = traceback.format_exc()
             result_display = {
@@ -424,15 +621,74 @@ class TranslationApp:
                 'error': str(e)
             }
 
+        result_display['generation'] = generation
         self.translation_queue.put(result_display)
 
-    def _check_translation_result(self):
-        """Проверка результата перевода"""
+    def _translate_stream_thread(self, text, generation, cancel):
+        """Перевод длинного текста: результаты отправляются по одному"""
+        if cancel.is_set():
+            return
+        count = 0
+        error = None
         try:
-            result = self.translation_queue.get_nowait()
-            self._show_translation_result(result)
-        except queue.Empty:
-            self.root.after(100, self._check_translation_result)
+            # Небольшие пакеты: первые предложения появляются почти сразу
+            for result in self.translator.translate_stream(text, batch_size=4, cancel=cancel):
+                if cancel.is_set():
+                    return
+                count += 1
+                self.translation_queue.put({'stream': result, 'generation': generation})
+        except Exception as e:
+            error = str(e)
+        self.translation_queue.put({'stream_done': count, 'error': error, 'generation': generation})
+
+    def _check_translation_result(self):
+        """Разбор готовых результатов; опрос идёт всё время работы окна"""
+        if self.rules_reloaded.is_set():
+            self.rules_reloaded.clear()
+            self.update_rules_display()
+            if self.rules_changed:
+                self.status_var.set(f"Правила перевода обновлены (версия {self.translator.ruleset.version})")
+            else:
+                self.status_var.set("Файл правил не изменился или содержит ошибки — действуют прежние правила")
+        while True:
+            try:
+                result = self.translation_queue.get_nowait()
+            except queue.Empty:
+                break
+            # Результаты устаревших запросов не показываются
+            if result['generation'] != self.generation:
+                continue
+            if 'stream' in result:
+                self._append_stream_result(result['stream'])
+            elif 'stream_done' in result:
+                self._finish_stream(result['stream_done'], result['error'])
+            else:
+                self._show_translation_result(result)
+        self.root.after(50, self._check_translation_result)
+
+    def _append_stream_result(self, result):
+        """Добавить перевод очередного предложения потока"""
+        translation = result['translation']
+        if translation is None:
+            translation = f"[Ошибка: {result.get('error')}]"
+        self.output_text.config(state='normal')
+        self.output_text.insert(tk.END, translation + " ")
+        self.output_text.see(tk.END)
+        self.output_text.config(state='disabled')
+
+        self.translation_details.config(state='normal')
+        self.translation_details.insert(tk.END, f"{result['original']}\n   → {translation}\n")
+        self.translation_details.see(tk.END)
+        self.translation_details.config(state='disabled')
+
+    def _finish_stream(self, count, error):
+        """Завершение потокового перевода"""
+        self.progress.stop()
+        self.progress.pack_forget()
+        if error:
+            self.status_var.set(f"Ошибка перевода после {count} предложений: {error}")
+        else:
+            self.status_var.set(f"Перевод завершен | Предложений: {count}")
 
     def _show_translation_result(self, result):
         """Показать результат перевода и анализов"""
@@ -500,6 +756,16 @@ class TranslationApp:
         for word_ru, word_en in result["word_translations"].items():
             details.append(f"   {word_ru} → {word_en}")
 
+        if "timings" in result:
+            timings = result["timings"]
+            details.append(f"\nВремя этапов (всего {timings['total_ms']:.1f} мс):")
+            for stage, info in timings["stages"].items():
+                details.append(f"   {stage}: {info['ms']:.2f} мс, вызовов: {info['calls']}")
+            if timings["counters"]:
+                details.append("Кэши и бэкенд:")
+                for name, value in timings["counters"].items():
+                    details.append(f"   {name}: {value}")
+
         return "\n".join(details)
 
     def _build_sentence_analysis(self, result):
@@ -614,6 +880,176 @@ class TranslationApp:
 
         return "\n".join(transform_lines)
 
+    @staticmethod
+    def _read_batch_sentences(path):
+        """Предложения из файла: непустые строки txt или колонка CSV"""
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            if not path.lower().endswith('.csv'):
+                return [line.strip() for line in f if line.strip()]
+            rows = csv.reader(f)
+            header = next(rows, [])
+            names = [name.strip().lower() for name in header]
+            for name in ('text', 'sentence', 'текст', 'предложение'):
+                if name in names:
+                    column = names.index(name)
+                    break
+            else:
+                # Заголовка нет: первая строка — тоже данные
+                column = 0
+                rows = chain([header], rows)
+            return [row[column].strip() for row in rows if len(row) > column and row[column].strip()]
+
+    def load_batch_file(self):
+        """Выбор файла и запуск пакетного перевода"""
+        path = filedialog.askopenfilename(
+            title="Файл для пакетного перевода",
+            filetypes=[("Текст и CSV", "*.txt *.csv"), ("Все файлы", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            sentences = self._read_batch_sentences(path)
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            messagebox.showerror("Ошибка", f"Не удалось прочитать файл: {e}")
+            return
+        if not sentences:
+            messagebox.showwarning("Внимание", "В файле нет предложений для перевода")
+            return
+
+        self.stop_batch()
+        self.batch_job = BatchJob(path, sentences)
+        self.batch_offset = 0
+        self.batch_follow = True
+        self.batch_progress.config(maximum=len(sentences), value=0)
+        self._render_batch_rows()
+        self._submit(self._batch_worker, self.batch_job, 0)
+        self.root.after(200, self._check_batch_progress, self.batch_job)
+
+    def stop_batch(self):
+        if self.batch_job is not None:
+            self.batch_job.cancel.set()
+
+    def _batch_worker(self, job, start):
+        """Перевод одной порции файла в потоке переводчика"""
+        if job.cancel.is_set():
+            job.finished = True
+            return
+        chunk = job.sentences[start:start + self.BATCH_CHUNK]
+        try:
+            job.results.extend(self.translator.translate_batch(chunk, batch_size=self.BATCH_CHUNK))
+        except Exception as e:
+            job.error = str(e)
+            job.finished = True
+            return
+        if start + self.BATCH_CHUNK >= len(job.sentences) or job.cancel.is_set():
+            job.finished = True
+            return
+        try:
+            self._submit(self._batch_worker, job, start + self.BATCH_CHUNK)
+        except RuntimeError:
+            # Окно закрыто, исполнитель уже остановлен
+            job.finished = True
+
+    def _check_batch_progress(self, job):
+        """Прогресс, скорость и оставшееся время пакетного перевода"""
+        if job is not self.batch_job:
+            return
+        done = len(job.results)
+        total = len(job.sentences)
+        elapsed = time.perf_counter() - job.started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        self.batch_progress['value'] = done
+        self._render_batch_rows()
+
+        name = os.path.basename(job.path)
+        if job.finished:
+            if job.error:
+                state = f"ошибка: {job.error}"
+            elif job.cancel.is_set() and done < total:
+                state = "остановлено"
+            else:
+                state = "готово"
+            self.batch_status_var.set(f"{name}: {done}/{total} за {elapsed:.1f} с ({rate:.1f} предл./с) — {state}")
+            return
+        eta = f"{(total - done) / rate:.0f} с" if rate else "—"
+        self.batch_status_var.set(f"{name}: {done}/{total} | {rate:.1f} предл./с | осталось ~{eta}")
+        self.root.after(200, self._check_batch_progress, job)
+
+    def _render_batch_rows(self):
+        """Показывает в таблице только видимое окно результатов"""
+        results = self.batch_job.results if self.batch_job is not None else []
+        total = len(results)
+        rows = self.batch_visible_rows
+        if self.batch_follow:
+            self.batch_offset = total - rows
+        self.batch_offset = max(0, min(self.batch_offset, total - rows))
+
+        self.batch_tree.delete(*self.batch_tree.get_children())
+        for index in range(self.batch_offset, min(total, self.batch_offset + rows)):
+            result = results[index]
+            translation = result.get('translation')
+            if translation is None:
+                translation = f"Ошибка: {result.get('error')}"
+            self.batch_tree.insert('', 'end', values=(index + 1, result['original'], translation,
+                                                      result.get('sentence_pattern', '')))
+        if total:
+            self.batch_scrollbar.set(self.batch_offset / total, min(1.0, (self.batch_offset + rows) / total))
+        else:
+            self.batch_scrollbar.set(0.0, 1.0)
+
+    def _batch_scroll(self, action, amount, unit=None):
+        """Команда полосы прокрутки и колеса мыши для виртуальной таблицы"""
+        total = len(self.batch_job.results) if self.batch_job is not None else 0
+        if action == 'moveto':
+            self.batch_offset = int(float(amount) * total)
+        else:
+            step = self.batch_visible_rows if unit == 'pages' else 1
+            self.batch_offset += int(amount) * step
+        self.batch_offset = max(0, min(self.batch_offset, total - self.batch_visible_rows))
+        self.batch_follow = self.batch_offset + self.batch_visible_rows >= total
+        self._render_batch_rows()
+
+    def _on_batch_resize(self, event):
+        # Высота строки ttk.Treeview по умолчанию — около 20 пикселей, заголовок — ещё одна строка
+        rows = max(1, event.height // 20 - 1)
+        if rows != self.batch_visible_rows:
+            self.batch_visible_rows = rows
+            self._render_batch_rows()
+
+    def export_batch_results(self):
+        """Сохранение результатов пакетного перевода в JSONL"""
+        if self.batch_job is None or not self.batch_job.results:
+            messagebox.showinfo("Экспорт", "Нет результатов для экспорта")
+            return
+        path = filedialog.asksaveasfilename(
+            title="Экспорт результатов",
+            defaultextension=".jsonl",
+            filetypes=[("JSON Lines", "*.jsonl"), ("Все файлы", "*.*")]
+        )
+        if not path:
+            return
+        results = list(self.batch_job.results)
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                for result in results:
+                    f.write(json.dumps(result, ensure_ascii=False) + "\n")
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить файл: {e}")
+            return
+        self.status_var.set(f"Экспортировано результатов: {len(results)} → {path}")
+
+    def on_close(self):
+        """Закрытие окна: прерываем перевод, не дожидаясь его завершения"""
+        self.cancel_event.set()
+        self.stop_batch()
+        if self.rules_watcher is not None:
+            self.rules_watcher.stop()
+        # shutdown(cancel_futures=True) появился только в Python 3.9
+        for future in list(self._futures):
+            future.cancel()
+        self.executor.shutdown(wait=False)
+        self.root.destroy()
+
     def generate_example(self):
         """Генерация случайного примера"""
         example = random.choice(self.examples)
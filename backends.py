@@ -0,0 +1,341 @@
+import http.client
+import json
+import queue
+import random
+import threading
+import time
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+
+class BackendError(Exception):
+    """Ошибка бэкенда перевода; retryable — временный ли это сбой (тайм-аут,
+    ошибка соединения, HTTP 429/5xx), после которого имеет смысл повторить запрос"""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class BackendUnavailable(BackendError):
+    """Предохранитель разомкнут или истёк срок запроса"""
+
+    def __init__(self, message: str):
+        super().__init__(message, retryable=False)
+
+
+class TranslationBackend:
+    """Интерфейс бэкенда перевода слов
+
+    translate_batch возвращает перевод для каждого слова или None, если
+    именно это слово перевести не удалось; при отказе всего запроса
+    бросается BackendError.
+    """
+
+    name = 'base'
+
+    def translate_batch(self, words: List[str], timeout: Optional[float] = None) -> List[Optional[str]]:
+        raise NotImplementedError
+
+    def translate(self, text: str) -> str:
+        result = self.translate_batch([text])[0]
+        if result is None:
+            raise BackendError(f"Не удалось перевести {text!r}", retryable=False)
+        return result
+
+    def close(self):
+        pass
+
+
+class GoogleBackend(TranslationBackend):
+    """Google Translate через deep_translator (импортируется при первом запросе)
+
+    Пакет слов отправляется одним запросом, по слову на строку; если ответ
+    не делится на то же число строк, слова переводятся по одному.
+    deep_translator не поддерживает тайм-ауты и пул соединений, поэтому
+    timeout здесь не используется.
+    """
+
+    name = 'google'
+    # Ограничение длины одного запроса к сервису
+    MAX_BATCH_CHARS = 4500
+    # Исключения deep_translator, означающие временный сбой сервиса
+    TRANSIENT_ERRORS = frozenset({'TooManyRequests', 'ServerException', 'RequestError'})
+
+    def __init__(self, source: str = 'ru', target: str = 'en'):
+        self.source = source
+        self.target = target
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from deep_translator import GoogleTranslator
+            self._client = GoogleTranslator(source=self.source, target=self.target)
+        return self._client
+
+    def translate_batch(self, words: List[str], timeout: Optional[float] = None) -> List[Optional[str]]:
+        results = []
+        chunk = []
+        chunk_chars = 0
+        for word in words:
+            if chunk and chunk_chars + len(word) + 1 > self.MAX_BATCH_CHARS:
+                results.extend(self._translate_chunk(chunk))
+                chunk, chunk_chars = [], 0
+            chunk.append(word)
+            chunk_chars += len(word) + 1
+        if chunk:
+            results.extend(self._translate_chunk(chunk))
+        return results
+
+    def _translate_chunk(self, words: List[str]) -> List[Optional[str]]:
+        try:
+            joined = self.client.translate('\n'.join(words))
+        except ImportError as e:
+            raise BackendError(str(e), retryable=False)
+        except Exception as e:
+            # Ошибки requests (тайм-ауты, соединение) наследуют OSError
+            transient = isinstance(e, OSError) or type(e).__name__ in self.TRANSIENT_ERRORS
+            raise BackendError(f"{type(e).__name__}: {e}", retryable=transient)
+        parts = joined.split('\n') if joined else []
+        if len(parts) == len(words):
+            return parts
+        # Ответ не разбирается построчно — переводим по одному слову
+        results = []
+        for word in words:
+            try:
+                results.append(self.client.translate(word))
+            except Exception:
+                results.append(None)
+        return results
+
+
+class HTTPBackend(TranslationBackend):
+    """JSON-бэкенд по HTTP/1.1 с пулом keep-alive соединений
+
+    Запрос: POST {url}/translate {"q": [...], "source": "ru", "target": "en"}
+    Ответ:  {"translations": [...]}
+    """
+
+    def __init__(self, url: str, pool_size: int = 8, timeout: float = 5.0,
+                 source: str = 'ru', target: str = 'en'):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f"Неподдерживаемая схема URL: {url}")
+        self.url = url
+        self.name = f"http:{parts.netloc}{parts.path.rstrip('/')}"
+        self._connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self._host = parts.hostname
+        self._port = parts.port
+        self._path = parts.path.rstrip('/') + '/translate'
+        self.timeout = timeout
+        self.source = source
+        self.target = target
+        self._pool: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue(maxsize=pool_size)
+
+    def _acquire(self, timeout: float) -> http.client.HTTPConnection:
+        try:
+            connection = self._pool.get_nowait()
+        except queue.Empty:
+            connection = self._connection_class(self._host, self._port, timeout=timeout)
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        return connection
+
+    def _release(self, connection: http.client.HTTPConnection):
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def translate_batch(self, words: List[str], timeout: Optional[float] = None) -> List[Optional[str]]:
+        timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        body = json.dumps({"q": words, "source": self.source, "target": self.target}, ensure_ascii=False)
+        connection = self._acquire(timeout)
+        try:
+            connection.request('POST', self._path, body.encode('utf-8'),
+                               {'Content-Type': 'application/json; charset=utf-8'})
+            response = connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            connection.close()
+            raise BackendError(f"{type(e).__name__}: {e}")
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(connection)
+        if response.status == 429 or response.status >= 500:
+            raise BackendError(f"HTTP {response.status}")
+        if response.status >= 400:
+            raise BackendError(f"HTTP {response.status}: {data[:200]!r}", retryable=False)
+        try:
+            translations = json.loads(data.decode('utf-8'))["translations"]
+        except (UnicodeDecodeError, ValueError, KeyError, TypeError) as e:
+            raise BackendError(f"Некорректный ответ: {e}", retryable=False)
+        if not isinstance(translations, list) or len(translations) != len(words):
+            raise BackendError("Число переводов не совпадает с числом слов", retryable=False)
+        return [t if isinstance(t, str) else None for t in translations]
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class TokenBucket:
+    """Ограничитель частоты запросов: rate токенов в секунду, не больше capacity"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """Ждёт токен; False — если до deadline (time.monotonic) его не получить"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """Предохранитель: после failure_threshold ошибок подряд запросы не
+    отправляются reset_timeout секунд, затем пропускается один пробный"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_running = False
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def release(self):
+        """Завершает запрос, ошибка которого ничего не говорит о доступности бэкенда"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class ResilientBackend(TranslationBackend):
+    """Обёртка над бэкендом: срок запроса, повторы с экспоненциальной
+    задержкой, ограничение частоты и предохранитель
+
+    Предохранитель учитывает только временные сбои (BackendError.retryable).
+    Остальные ошибки — отсутствующий пакет, HTTP 4xx, неверный ответ —
+    говорят о настройке, а не о доступности сервиса: они не повторяются,
+    не размыкают предохранитель и сразу передаются вызывающему.
+    """
+
+    def __init__(self, inner: TranslationBackend, deadline: float = 10.0, max_retries: int = 3,
+                 backoff_base: float = 0.2, backoff_max: float = 5.0, rate: Optional[float] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.inner = inner
+        self.name = inner.name
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = TokenBucket(rate) if rate else None
+        self.breaker = breaker or CircuitBreaker()
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "rejected": 0}
+
+    def translate_batch(self, words: List[str], timeout: Optional[float] = None) -> List[Optional[str]]:
+        deadline = time.monotonic() + (self.deadline if timeout is None else min(timeout, self.deadline))
+        last_error: Optional[BackendError] = None
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None and not self.rate_limiter.acquire(deadline):
+                raise BackendUnavailable(f"Истёк срок запроса к {self.name} в очереди ограничителя")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Разрешение предохранителя — последним: пробный запрос полуоткрытого
+            # предохранителя должен дойти до бэкенда и завершиться записью результата
+            if not self.breaker.allow():
+                self.stats["rejected"] += 1
+                raise BackendUnavailable(f"Бэкенд {self.name} временно отключён предохранителем")
+            self.stats["calls"] += 1
+            try:
+                result = self.inner.translate_batch(words, timeout=remaining)
+            except BackendError as e:
+                self.stats["failures"] += 1
+                if not e.retryable:
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                last_error = e
+                if attempt == self.max_retries:
+                    break
+                delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+                if time.monotonic() + delay >= deadline:
+                    break
+                self.stats["retries"] += 1
+                time.sleep(delay)
+                continue
+            except Exception:
+                # Непредвиденная ошибка не должна оставить пробный запрос незавершённым
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return result
+        if last_error is not None:
+            raise last_error
+        raise BackendUnavailable(f"Истёк срок запроса к {self.name}")
+
+    def close(self):
+        self.inner.close()
+
+
+def create_backend(spec: str = 'google', **options) -> TranslationBackend:
+    """Бэкенд по строке: 'google' или URL HTTP-сервиса; options — для ResilientBackend"""
+    if spec == 'google':
+        inner = GoogleBackend()
+    elif spec.startswith(('http://', 'https://')):
+        inner = HTTPBackend(spec)
+    else:
+        raise ValueError(f"Неизвестный бэкенд перевода: {spec}")
+    return ResilientBackend(inner, **options)
@@ -0,0 +1,244 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from backends import TranslationBackend
+from main import AdvancedTransformationalTranslator
+from standin_server import StandinTranslator
+
+
+# Фиксированные корпуса: результаты сравнимы между коммитами, только пока они не меняются
+CORPORA = {
+    "short": [
+        "Я читаю.",
+        "Она спит.",
+        "Кто работает?",
+        "Сколько стоит кофе?",
+        "Мы ждём автобус.",
+        "У меня есть кот.",
+    ],
+    "medium": [
+        "В парке я вижу собаку.",
+        "Она пьёт чай с молоком.",
+        "Что делает папа в саду?",
+        "У меня есть дом в деревне.",
+        "Я кладу книгу на стол.",
+        "Мальчик смотрит телевизор дома.",
+    ],
+    "long": [
+        "Когда я пришел домой, мама готовила ужин на кухне.",
+        "Мой старший брат каждый день читает интересные книги в большой библиотеке.",
+        "Почему наши соседи так громко слушают музыку поздно вечером?",
+        "У моей бабушки есть маленький дом в деревне у реки.",
+        "Учитель дал ученику новую тетрадь после урока.",
+        "Вчера мы долго ждали поезд на холодном вокзале.",
+    ],
+}
+
+BENCHMARKS = [
+    "stanza_syntax_analysis",
+    "fallback_syntax_analysis",
+    "is_verb_simple",
+    "_safe_translate_word",
+    "detect_special_pattern",
+    "build_improved_question",
+    "generate_from_json_template",
+]
+
+
+class StubBackend(TranslationBackend):
+    """Бэкенд без сети: детерминированные ответы заменителя сервиса перевода"""
+
+    name = 'stub'
+
+    def __init__(self):
+        self.translator = StandinTranslator()
+        self.calls = 0
+
+    def translate_batch(self, words: List[str], timeout: Optional[float] = None) -> List[Optional[str]]:
+        self.calls += 1
+        return [self.translator.translate(word) for word in words]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(cases: List[Callable[[], object]], min_time: float, min_ops: int) -> Dict:
+    """Вызывает случаи по кругу не меньше min_time секунд и min_ops раз"""
+    for case in cases:
+        case()
+    samples = []
+    clock = time.perf_counter
+    started = clock()
+    while True:
+        for case in cases:
+            begin = clock()
+            case()
+            samples.append(clock() - begin)
+        if len(samples) >= min_ops and clock() - started >= min_time:
+            break
+    samples.sort()
+    total = sum(samples)
+    return {
+        "ops": len(samples),
+        "ops_per_sec": len(samples) / total if total else float("inf"),
+        "mean_us": total / len(samples) * 1e6,
+        "p50_us": percentile(samples, 0.50) * 1e6,
+        "p90_us": percentile(samples, 0.90) * 1e6,
+        "p99_us": percentile(samples, 0.99) * 1e6,
+        "max_us": samples[-1] * 1e6,
+    }
+
+
+def _runs_cleanly(case: Callable[[], object]) -> bool:
+    try:
+        case()
+        return True
+    except Exception:
+        return False
+
+
+def build_cases(translator: AdvancedTransformationalTranslator, name: str,
+                sentences: List[str]) -> List[Callable[[], object]]:
+    """Замыкания для одного замера; входные структуры готовятся заранее"""
+    if name == "stanza_syntax_analysis":
+        if not translator.STANZA_AVAILABLE:
+            return []
+        return [lambda s=s: translator.stanza_syntax_analysis(s) for s in sentences]
+
+    if name == "is_verb_simple":
+        contexts = [translator.build_analysis_context(s) for s in sentences]
+        return [lambda w=w, c=c: translator.is_verb_simple(w, c) for c in contexts for w in c.tokens]
+
+    if name == "_safe_translate_word":
+        # Кэш в памяти очищается перед каждым вызовом, чтобы измерять путь до бэкенда
+        def translate(word):
+            translator.translation_cache.clear()
+            return translator._safe_translate_word(word)
+        words = dict.fromkeys(w for s in sentences for w in translator.build_analysis_context(s).tokens)
+        return [lambda w=w: translate(w) for w in words]
+
+    cases = []
+    for sentence in sentences:
+        context = translator.build_analysis_context(sentence)
+        structure = translator.parse_russian_sentence_improved(sentence, context)
+        if name == "fallback_syntax_analysis":
+            empty = dict(structure, subject=None, verb=None, object=None, question_word=None)
+            case = lambda s=sentence, e=empty, c=context: translator.fallback_syntax_analysis(dict(e), s, c)
+        elif name == "detect_special_pattern":
+            # Без контекста: иначе возвращались бы триггеры, уже сохранённые при разборе
+            bare = {key: value for key, value in structure.items() if key != "context"}
+            case = lambda s=sentence, st=bare: translator.detect_special_pattern(s, st)
+        elif name == "build_improved_question":
+            if structure["type"] != "interrogative":
+                continue
+            en_structure = translator.transform_sentence_structure(structure)
+            case = lambda e=en_structure: translator.build_improved_question(dict(e))
+        elif name == "generate_from_json_template":
+            if structure["pattern"] not in translator.extended_patterns:
+                continue
+            en_structure = translator.transform_sentence_structure(structure)
+            case = lambda e=en_structure: translator.generate_from_json_template(dict(e), e["pattern"])
+        else:
+            raise ValueError(f"Неизвестный замер: {name}")
+        # Предложения, на которых функция падает, не замеряются
+        if _runs_cleanly(case):
+            cases.append(case)
+    return cases
+
+
+def git_revision() -> Optional[str]:
+    try:
+        repo = os.path.dirname(os.path.abspath(__file__))
+        return subprocess.run(["git", "-C", repo, "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(benchmarks: List[str], stanza_modes: List[bool], min_time: float = 0.5,
+                   min_ops: int = 50) -> Dict:
+    translator = AdvancedTransformationalTranslator(cache_path=None, memory_size=0, backend=StubBackend())
+    stanza_loaded = translator.STANZA_AVAILABLE
+    results = []
+    for stanza_on in stanza_modes:
+        if stanza_on and not stanza_loaded:
+            print("Stanza недоступна — замеры с Stanza пропущены", file=sys.stderr)
+            continue
+        translator.STANZA_AVAILABLE = stanza_on
+        for name in benchmarks:
+            for corpus_name, sentences in CORPORA.items():
+                cases = build_cases(translator, name, sentences)
+                if not cases:
+                    continue
+                stats = measure(cases, min_time, min_ops)
+                stats.update(benchmark=name, corpus=corpus_name, stanza=stanza_on, cases=len(cases))
+                results.append(stats)
+                print(f"{name:28} {corpus_name:7} stanza={'on ' if stanza_on else 'off'} "
+                      f"{stats['ops_per_sec']:>12.1f} оп/с  p50 {stats['p50_us']:>9.1f} мкс  "
+                      f"p99 {stats['p99_us']:>9.1f} мкс", file=sys.stderr)
+    translator.STANZA_AVAILABLE = stanza_loaded
+    return {
+        "revision": git_revision(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "morph_available": translator.MORPH_AVAILABLE,
+        "stanza_available": stanza_loaded,
+        "min_time": min_time,
+        "results": results,
+    }
+
+
+def compare(baseline: Dict, current: Dict) -> List[str]:
+    """Строки сравнения ops/sec с прошлым прогоном (>1 — быстрее)"""
+    previous = {(r["benchmark"], r["corpus"], r["stanza"]): r for r in baseline["results"]}
+    lines = [f"Сравнение с {baseline.get('revision') or 'предыдущим прогоном'}:"]
+    for result in current["results"]:
+        old = previous.get((result["benchmark"], result["corpus"], result["stanza"]))
+        if old is None:
+            continue
+        ratio = result["ops_per_sec"] / old["ops_per_sec"]
+        lines.append(f"{result['benchmark']:28} {result['corpus']:7} "
+                     f"stanza={'on ' if result['stanza'] else 'off'} x{ratio:.2f}")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Микробенчмарки этапов переводчика")
+    parser.add_argument("-o", "--output", default=None, help="JSON-файл с результатами")
+    parser.add_argument("--compare", default=None, help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--stanza", choices=["on", "off", "both"], default="both")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Секунд на один замер")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=BENCHMARKS)
+    args = parser.parse_args(argv)
+
+    # Диагностика переводчика не должна смешиваться с JSON на stdout
+    stdout = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        modes = {"on": [True], "off": [False], "both": [True, False]}[args.stanza]
+        report = run_benchmarks(args.only, modes, args.min_time)
+    finally:
+        sys.stdout = stdout
+
+    data = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(data + "\n")
+    else:
+        print(data)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            for line in compare(json.load(f), report):
+                print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
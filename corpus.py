@@ -0,0 +1,159 @@
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from analysis_router import ANALYSIS_MODES
+from main import AdvancedTransformationalTranslator
+from segmentation import iter_sentences
+
+
+# Переводчик процесса-воркера: при fork наследуется от родителя уже загруженным
+_worker_translator: Optional[AdvancedTransformationalTranslator] = None
+
+
+def set_torch_threads(threads: int):
+    """Ограничивает число потоков torch, чтобы воркеры не конкурировали за ядра"""
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _init_worker(cache_path: Optional[str], torch_threads: int, options: Dict):
+    global _worker_translator
+    # Диагностика воркеров не должна смешиваться с выводом результатов
+    sys.stdout = sys.stderr
+    set_torch_threads(torch_threads)
+    if _worker_translator is None:
+        # spawn: каждый воркер загружает правила и модели сам
+        _worker_translator = AdvancedTransformationalTranslator(cache_path=cache_path, **options)
+    elif cache_path:
+        # Соединение SQLite нельзя использовать после fork — открываем своё
+        _worker_translator.init_persistent_cache(cache_path, preload=False)
+
+
+def _translate_chunk(args):
+    sentences, batch_size = args
+    return _worker_translator.translate_batch(sentences, batch_size=batch_size)
+
+
+def iter_chunks(lines: Iterable[str], chunk_size: int) -> Iterator[List[str]]:
+    """Группирует непустые строки корпуса в порции по chunk_size"""
+    chunk = []
+    for line in lines:
+        sentence = line.strip()
+        if not sentence:
+            continue
+        chunk.append(sentence)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def translate_corpus(lines: Iterable[str], workers: int = 0, chunk_size: int = 256,
+                     batch_size: int = 64, cache_path: Optional[str] = None,
+                     torch_threads: int = 1, translator_options: Optional[Dict] = None) -> Iterator[Dict]:
+    """Переводит корпус в пуле процессов, выдавая результаты в исходном порядке
+
+    Строки читаются лениво, в работе одновременно держится не больше
+    2 * workers порций, поэтому память не зависит от размера корпуса.
+    translator_options передаются в конструктор переводчика.
+    """
+    global _worker_translator
+    options = translator_options or {}
+    workers = workers or os.cpu_count() or 1
+    chunks = iter_chunks(lines, chunk_size)
+
+    if workers == 1:
+        set_torch_threads(torch_threads)
+        translator = AdvancedTransformationalTranslator(cache_path=cache_path, **options)
+        for chunk in chunks:
+            yield from translator.translate_batch(chunk, batch_size=batch_size)
+        return
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+        # Правила и модели загружаются один раз до fork, страницы памяти
+        # делятся между воркерами по принципу copy-on-write
+        set_torch_threads(torch_threads)
+        _worker_translator = AdvancedTransformationalTranslator(cache_path=cache_path, **options)
+        if _worker_translator.persistent_cache is not None:
+            _worker_translator.persistent_cache.close()
+            _worker_translator.persistent_cache = None
+        # Открытые keep-alive соединения бэкенда не должны достаться нескольким воркерам
+        _worker_translator.backend.close()
+        # Сборщик мусора не должен трогать унаследованные объекты и копировать страницы
+        gc.freeze()
+    else:
+        context = multiprocessing.get_context('spawn')
+
+    with context.Pool(workers, initializer=_init_worker, initargs=(cache_path, torch_threads, options)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(_translate_chunk, ((chunk, batch_size),)))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Перевод корпуса предложений в нескольких процессах")
+    parser.add_argument("input", help="Текстовый файл: одно предложение на строку ('-' — stdin)")
+    parser.add_argument("--segment", action="store_true",
+                        help="Вход — связный текст: делить его на предложения, а не на строки")
+    parser.add_argument("-o", "--output", default="-", help="Файл JSONL с результатами ('-' — stdout)")
+    parser.add_argument("-j", "--workers", type=int, default=0, help="Число процессов (по умолчанию — число ядер)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Строк в одной порции для воркера")
+    parser.add_argument("--batch-size", type=int, default=64, help="Размер пакета Stanza внутри порции")
+    parser.add_argument("--cache", default=None, help="Путь к дисковому кэшу переводов слов")
+    parser.add_argument("--torch-threads", type=int, default=1, help="Потоков torch на воркер")
+    parser.add_argument("--lexicon", default=None, help="Офлайн-словарь (см. lexicon.py build)")
+    parser.add_argument("--offline", action="store_true", help="Не обращаться к сетевому переводчику")
+    parser.add_argument("--backend", default="google", help="'google' или URL HTTP-сервиса перевода слов")
+    parser.add_argument("--analysis", choices=ANALYSIS_MODES, default="stanza",
+                        help="Синтаксический анализ: всегда Stanza, adaptive — Stanza только для сложных предложений, "
+                             "morph — только морфология")
+    args = parser.parse_args(argv)
+    options = {"lexicon_path": args.lexicon, "offline": args.offline, "backend": args.backend,
+               "analysis": args.analysis}
+
+    source = sys.stdin if args.input == "-" else open(args.input, 'r', encoding='utf-8')
+    target = sys.stdout if args.output == "-" else open(args.output, 'w', encoding='utf-8')
+    # Сообщения переводчика уходят в stderr, stdout остаётся только для JSONL
+    sys.stdout = sys.stderr
+    started = time.perf_counter()
+    count = 0
+    paths: Dict[str, int] = {}
+    lines = iter_sentences(source) if args.segment else source
+    try:
+        for result in translate_corpus(lines, args.workers, args.chunk_size, args.batch_size,
+                                       args.cache, args.torch_threads, options):
+            target.write(json.dumps(result, ensure_ascii=False) + "\n")
+            count += 1
+            path = result.get("analysis_path")
+            if path:
+                paths[path] = paths.get(path, 0) + 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.__stdout__:
+            target.close()
+    elapsed = time.perf_counter() - started
+    print(f"Переведено предложений: {count} за {elapsed:.1f} с "
+          f"({count / elapsed if elapsed else 0:.1f} предл./с)", file=sys.stderr)
+    if paths:
+        print("Пути анализа: " + ", ".join(f"{path} {n}" for path, n in sorted(paths.items())), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+
+# Формат файла словаря:
+#   заголовок   MAGIC (8 байт), число записей (uint64)
+#   таблица     смещения начала записей, uint64 на запись, плюс конец последней
+#   записи      b"слово\tперевод", отсортированы по байтам UTF-8 ключа
+# Порядок байт UTF-8 совпадает с порядком кодовых точек, поэтому бинарный
+# поиск идёт прямо по отображённому в память файлу без разбора при загрузке.
+MAGIC = b'RUENLEX1'
+HEADER = struct.Struct('<8sQ')
+OFFSET = struct.Struct('<Q')
+
+
+class MmapLexicon:
+    """Русско-английский словарь в отображённом в память файле
+
+    Поиск — O(log n) по таблице смещений. Файл не читается целиком:
+    страницы подгружаются ОС по требованию и делятся между процессами.
+    """
+
+    name = 'mmap-lexicon'
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path}: не является файлом словаря")
+        self._table = HEADER.size
+        self._records = self._table + OFFSET.size * (self._count + 1)
+
+    def _record(self, index: int) -> Tuple[int, int]:
+        start = OFFSET.unpack_from(self._mm, self._table + OFFSET.size * index)[0]
+        end = OFFSET.unpack_from(self._mm, self._table + OFFSET.size * (index + 1))[0]
+        return self._records + start, self._records + end
+
+    def _key_at(self, index: int) -> Tuple[bytes, int, int]:
+        start, end = self._record(index)
+        separator = self._mm.find(b'\t', start, end)
+        return self._mm[start:separator], separator + 1, end
+
+    def get(self, word: str, default: Optional[str] = None) -> Optional[str]:
+        key = word.lower().encode('utf-8')
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            current, value_start, value_end = self._key_at(middle)
+            if current < key:
+                low = middle + 1
+            elif current > key:
+                high = middle
+            else:
+                return self._mm[value_start:value_end].decode('utf-8')
+        return default
+
+    def __contains__(self, word: str) -> bool:
+        return self.get(word) is not None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self):
+        self._mm.close()
+
+
+def read_tsv(path: str) -> Iterator[Tuple[str, str]]:
+    """Пары из TSV «слово<TAB>перевод»; из перевода берётся первый вариант"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.rstrip('\n').split('\t')
+            if len(parts) < 2 or not parts[0].strip():
+                continue
+            translation = parts[1].split(';')[0].split(',')[0].strip()
+            if translation:
+                yield parts[0].strip().lower(), translation
+
+
+def build_lexicon(pairs: Iterable[Tuple[str, str]], output_path: str) -> int:
+    """Собирает файл словаря; при повторе слова сохраняется первый перевод"""
+    entries = {}
+    for word, translation in pairs:
+        key = word.encode('utf-8')
+        if key not in entries:
+            entries[key] = translation.replace('\t', ' ').replace('\n', ' ').encode('utf-8')
+    keys: List[bytes] = sorted(entries)
+
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(keys)))
+        offset = 0
+        for key in keys:
+            f.write(OFFSET.pack(offset))
+            offset += len(key) + 1 + len(entries[key])
+        f.write(OFFSET.pack(offset))
+        for key in keys:
+            f.write(key + b'\t' + entries[key])
+    os.replace(tmp_path, output_path)
+    return len(keys)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Офлайн-словарь для переводчика")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Собрать словарь из TSV (слово<TAB>перевод)")
+    build.add_argument("tsv")
+    build.add_argument("output")
+    lookup = commands.add_parser("lookup", help="Найти слова в словаре")
+    lookup.add_argument("lexicon")
+    lookup.add_argument("words", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        count = build_lexicon(read_tsv(args.tsv), args.output)
+        print(f"Записей в словаре {args.output}: {count}")
+    else:
+        lexicon = MmapLexicon(args.lexicon)
+        for word in args.words:
+            print(f"{word}\t{lexicon.get(word, '-')}")
+        lexicon.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,29 +1,64 @@
-import json
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional, Union
 import re
-from deep_translator import GoogleTranslator
 import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from analysis_context import SentenceAnalysisContext, first_position_after, index_tokens
+from analysis_router import AnalysisRouter
+from backends import BackendError, TranslationBackend, create_backend
+from lexicon import MmapLexicon
+from morph_cache import MorphAnalysis, MorphCache
+from ruleset import CompiledRuleset, load_ruleset
+from segmentation import iter_sentences
+from stage_timings import DISABLED_TIMINGS, StageTimings
+from surface_realizer import BASIC_SLOTS
+from token_store import TokenTable
+from translation_cache import PersistentTranslationCache, DEFAULT_CACHE_PATH
+from translation_memory import TranslationMemory
+
+
+RULES_FILE = 'transformational_grammar_rules.json'
+
+
+class TranslationCancelled(Exception):
+    """Перевод прерван: событие cancel установлено до завершения"""
 
 
 class AdvancedTransformationalTranslator:
-    def __init__(self):
+    def __init__(self, cache_path: Optional[str] = DEFAULT_CACHE_PATH, load_models: bool = True,
+                 memory_size: int = 10000, lexicon_path: Optional[str] = None, offline: bool = False,
+                 backend: Union[str, TranslationBackend] = 'google', instrument: bool = False,
+                 analysis: Union[str, AnalysisRouter] = 'stanza'):
         self.MORPH_AVAILABLE = False
         self.STANZA_AVAILABLE = False
+        self.morph = None
+        self.morph_cache = None
+        self.stanza_nlp = None
 
-        try:
-            import pymorphy2
-            import stanza
-            self.MORPH_AVAILABLE = True
-            self.STANZA_AVAILABLE = True
-            print("Все лингвистические анализаторы доступны")
-        except ImportError as e:
-            print(f"Не все анализаторы установлены: {e}")
-            self.MORPH_AVAILABLE = False
-            self.STANZA_AVAILABLE = False
-
-        # Для перевода отдельных слов (вместо словаря)
-        self.translator = GoogleTranslator(source='ru', target='en')
+        # Готовность тяжёлых моделей и время этапов запуска (секунды)
+        self.models_ready = threading.Event()
+        self._models_lock = threading.Lock()
+        self.startup_timings: Dict[str, float] = {}
+        # Замеры этапов каждого перевода (результат получает ключ "timings")
+        self.instrument = instrument
+        self._request = threading.local()
+        # Выбор между Stanza и морфологическим разбором: 'stanza', 'adaptive', 'morph' или готовый маршрутизатор
+        self.analysis_router = AnalysisRouter(analysis) if isinstance(analysis, str) else analysis
+
+        # Для перевода отдельных слов (вместо словаря): 'google', URL HTTP-сервиса или готовый бэкенд
+        self.backend = create_backend(backend) if isinstance(backend, str) else backend
+        self.target_language = 'en'
         self.translation_cache = {}
+        self.persistent_cache = None
+        # Офлайн-словарь: любой объект с методом get(word); offline отключает сетевой перевод
+        self.lexicon = None
+        self.offline = offline
+        # Память переводов целых предложений
+        self.translation_memory = TranslationMemory(memory_size)
 
         # Минимальный словарь для критически важных слов
         self.correction_dict = {
@@ -44,143 +79,392 @@ class AdvancedTransformationalTranslator:
             'сколько': 'how much'
         }
 
-        self.grammar_rules = self.load_grammar_rules()
-        self.morph = None
-        self.stanza_nlp = None
+        # Правила можно перезагрузить на лету (reload_rules): запрос работает с
+        # правилами, действовавшими при его начале, новые запросы — с новыми
+        self.rules_path = os.path.abspath(RULES_FILE)
+        self._rules_lock = threading.Lock()
+        # Слова, чей перевод из lexical_corrections изменился при перезагрузке
+        self._stale_words = set()
+        with self._timed("rules"):
+            ruleset = self.load_compiled_rules()
 
-        if self.MORPH_AVAILABLE:
-            try:
-                import pymorphy2
-                self.morph = pymorphy2.MorphAnalyzer()
-                print("Морфологический анализатор инициализирован")
-            except Exception as e:
-                print(f"Ошибка инициализации pymorphy2: {e}")
-                self.MORPH_AVAILABLE = False
+        if ruleset is not None and ruleset.is_valid:
+            print("Файл JSON загружен!")
+            for error in ruleset.template_errors:
+                print(f"Шаблон отключён — {error}")
+        else:
+            print("Файл JSON не загружен.")
+            ruleset = CompiledRuleset({}, "builtin")
+        self._ruleset = ruleset
+
+        if lexicon_path:
+            with self._timed("lexicon"):
+                try:
+                    self.lexicon = MmapLexicon(lexicon_path)
+                    print(f"Офлайн-словарь {lexicon_path}: {len(self.lexicon)} слов")
+                except (OSError, ValueError) as e:
+                    print(f"Не удалось открыть офлайн-словарь {lexicon_path}: {e}")
 
-        if self.STANZA_AVAILABLE:
+        if cache_path:
+            self.init_persistent_cache(cache_path)
+
+        if load_models:
+            self.load_models()
+
+    @contextmanager
+    def _timed(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.startup_timings[stage] = time.perf_counter() - started
+
+    def startup_report(self) -> str:
+        """Время этапов запуска в читаемом виде"""
+        return ", ".join(f"{stage}: {seconds:.2f} с" for stage, seconds in self.startup_timings.items())
+
+    @property
+    def ruleset(self) -> CompiledRuleset:
+        """Правила текущего запроса в этом потоке; вне запроса — действующие"""
+        return getattr(self._request, 'ruleset', self._ruleset)
+
+    @property
+    def grammar_rules(self) -> Dict:
+        return self.ruleset.rules or {"error": "No JSON file found"}
+
+    @property
+    def json_loaded(self) -> bool:
+        return self.ruleset.is_valid
+
+    @property
+    def patterns(self) -> Dict:
+        return self.ruleset.patterns
+
+    @property
+    def extended_patterns(self) -> Dict:
+        return self.ruleset.extended_patterns
+
+    @property
+    def lexical_corrections(self) -> Dict:
+        return self.ruleset.lexical_corrections
+
+    @property
+    def preposition_rules(self) -> Dict:
+        return self.ruleset.preposition_rules
+
+    @contextmanager
+    def _pinned_rules(self):
+        """Закрепляет действующие правила за запросом в этом потоке
+
+        Вложенные вызовы используют правила внешнего. Перед закреплением из
+        кэша переводов слов убираются слова, чьи исправления изменились.
+        """
+        if hasattr(self._request, 'ruleset'):
+            yield
+            return
+        with self._rules_lock:
+            if self._stale_words:
+                stale, self._stale_words = self._stale_words, set()
+                # Снимок ключей: кэш одновременно пополняют другие потоки (например, предзагрузка в GUI)
+                for word in [w for w in list(self.translation_cache) if w.lower() in stale]:
+                    self.translation_cache.pop(word, None)
+            self._request.ruleset = self._ruleset
+        try:
+            yield
+        finally:
+            del self._request.ruleset
+
+    def reload_rules(self, path: Optional[str] = None) -> bool:
+        """Перечитывает файл правил и, если он корректен и изменился, применяет его
+
+        Можно вызывать из любого потока: правила компилируются и проверяются
+        в нём, а затем заменяются одним присваиванием. Переводы, начатые до
+        замены, доделываются по старым правилам. Память переводов
+        сбрасывается сама (её штамп содержит версию правил), из кэша
+        переводов слов при следующем запросе убираются только слова с
+        изменившимися исправлениями.
+        """
+        path = os.path.abspath(path or self.rules_path)
+        try:
+            ruleset = load_ruleset(path)
+        except (OSError, ValueError) as e:
+            print(f"Правила из {path} не применены: {e}")
+            return False
+        if not ruleset.is_valid:
+            print(f"Правила из {path} не применены: нет раздела english_grammar_system")
+            return False
+        with self._rules_lock:
+            current = self._ruleset
+            if ruleset.version == current.version and path == self.rules_path:
+                return False
+            for error in ruleset.template_errors:
+                print(f"Шаблон отключён — {error}")
+            self._stale_words.update(word for word in current.lexicon.keys() | ruleset.lexicon.keys()
+                                     if current.lexicon.get(word) != ruleset.lexicon.get(word))
+            self.rules_path = path
+            self._ruleset = ruleset
+        print(f"Правила обновлены: версия {current.version} → {ruleset.version}")
+        return True
+
+    @property
+    def timings(self):
+        """Замеры текущего перевода в этом потоке или заглушка, если они выключены"""
+        return getattr(self._request, 'timings', DISABLED_TIMINGS)
+
+    @property
+    def backend(self) -> TranslationBackend:
+        return self._backend
+
+    @backend.setter
+    def backend(self, value: TranslationBackend):
+        self._backend = value
+        self.backend_name = value.name
+
+    # Прежнее имя клиента перевода
+    translator = backend
+
+    def load_models(self):
+        """Загрузка pymorphy2 и Stanza; безопасно вызывать из фонового потока
+
+        Пока модели не загружены, переводы выполняются упрощённым
+        анализатором (fallback_syntax_analysis и эвристики окончаний).
+        """
+        with self._models_lock:
+            if self.models_ready.is_set():
+                return
             try:
+                self._load_models()
+            finally:
+                self.models_ready.set()
+
+    def _load_models(self):
+        try:
+            with self._timed("import_pymorphy2"):
+                import pymorphy2
+            with self._timed("import_stanza"):
                 import stanza
+            print("Все лингвистические анализаторы доступны")
+        except ImportError as e:
+            print(f"Не все анализаторы установлены: {e}")
+            return
+
+        try:
+            with self._timed("pymorphy2"):
+                morph = pymorphy2.MorphAnalyzer()
+            self.morph_cache = MorphCache(morph)
+            self.morph = morph
+            self.MORPH_AVAILABLE = True
+            print("Морфологический анализатор инициализирован")
+        except Exception as e:
+            print(f"Ошибка инициализации pymorphy2: {e}")
+
+        try:
+            with self._timed("stanza"):
                 try:
-                    self.stanza_nlp = stanza.Pipeline('ru', processors='tokenize,pos,lemma,depparse')
-                    print("Stanza инициализирован")
+                    stanza_nlp = stanza.Pipeline('ru', processors='tokenize,pos,lemma,depparse')
                 except:
                     print("Скачиваем модель Stanza для русского языка...")
                     stanza.download('ru')
-                    self.stanza_nlp = stanza.Pipeline('ru', processors='tokenize,pos,lemma,depparse')
-                    print("Stanza инициализирован")
-            except Exception as e:
-                print(f"Ошибка инициализации Stanza: {e}")
-                self.STANZA_AVAILABLE = False
+                    stanza_nlp = stanza.Pipeline('ru', processors='tokenize,pos,lemma,depparse')
+            # Флаг выставляется последним: параллельные переводы видят готовый конвейер
+            self.stanza_nlp = stanza_nlp
+            self.STANZA_AVAILABLE = True
+            print("Stanza инициализирован")
+        except Exception as e:
+            print(f"Ошибка инициализации Stanza: {e}")
 
-        if self.is_json_loaded_properly():
-            print("Файл JSON загружен!")
-            self.json_loaded = True
-            self.patterns = self.grammar_rules["english_grammar_system"]["sentence_patterns"]["basic_clause_patterns"]
-            self.extended_patterns = self.grammar_rules["english_grammar_system"]["sentence_patterns"][
-                "extended_patterns"]
-            self.lexical_corrections = self.grammar_rules["english_grammar_system"].get("lexical_corrections", {})
-            self.preposition_rules = self.grammar_rules["english_grammar_system"].get("preposition_rules", {})
-        else:
-            print("Файл JSON не загружен.")
-            self.json_loaded = False
-            self.patterns = {}
-            self.extended_patterns = {}
-            self.lexical_corrections = {}
-            self.preposition_rules = {}
+    def init_persistent_cache(self, cache_path: str, preload: bool = True):
+        """Открывает дисковый кэш переводов и заранее загружает его в память"""
+        with self._timed("translation_cache"):
+            self._init_persistent_cache(cache_path, preload)
+
+    def _init_persistent_cache(self, cache_path: str, preload: bool):
+        try:
+            self.persistent_cache = PersistentTranslationCache(cache_path)
+            if not preload:
+                return
+            preloaded = self.persistent_cache.preload(self.backend_name, self.target_language)
+        except (sqlite3.Error, OSError) as e:
+            print(f"Не удалось открыть кэш переводов {cache_path}: {e}")
+            self.persistent_cache = None
+            return
+        # Локальные исправления имеют приоритет над сохранёнными сетевыми переводами
+        for word, translation in preloaded.items():
+            if not self._has_local_translation(word):
+                self.translation_cache[word] = translation
+        print(f"Из кэша {cache_path} загружено переводов: {len(preloaded)}")
+
+    def _has_local_translation(self, word: str) -> bool:
+        return self._lookup_local_translation(word) is not None
 
     def is_json_loaded_properly(self) -> bool:
         if not self.grammar_rules or "error" in self.grammar_rules:
             return False
         return "english_grammar_system" in self.grammar_rules
 
-    def load_grammar_rules(self) -> Dict:
-        json_files = ['transformational_grammar_rules.json']
+    def load_compiled_rules(self) -> Optional[CompiledRuleset]:
+        """Загрузка и компиляция правил из JSON"""
+        json_files = [RULES_FILE]
         for json_file in json_files:
             try:
                 if os.path.exists(json_file):
                     print(f"Найден файл: {json_file}")
-                    with open(json_file, 'r', encoding='utf-8') as f:
-                        rules = json.load(f)
-                        print(f"Файл {json_file} успешно загружен")
-                        return rules
+                    ruleset = load_ruleset(json_file)
+                    self.rules_path = os.path.abspath(json_file)
+                    print(f"Файл {json_file} успешно загружен (версия правил {ruleset.version})")
+                    return ruleset
             except Exception as e:
                 print(f"Ошибка при загрузке {json_file}: {e}")
-        return {"error": "No JSON file found"}
+        return None
+
+    def load_grammar_rules(self) -> Dict:
+        ruleset = self.load_compiled_rules()
+        return ruleset.rules if ruleset is not None else {"error": "No JSON file found"}
 
     def stanza_syntax_analysis(self, sentence: str) -> Dict:
         if not self.STANZA_AVAILABLE or not self.stanza_nlp:
             return {"error": "Stanza analyzer not available"}
         try:
-            doc = self.stanza_nlp(sentence)
-            analysis = {"sentences": [], "tokens": [], "dependencies": []}
-            for sent in doc.sentences:
-                sentence_info = {"text": sent.text, "words": [], "dependencies": []}
-                for word in sent.words:
-                    word_info = {
-                        "id": word.id,
-                        "text": word.text,
-                        "lemma": word.lemma,
-                        "upos": word.upos,
-                        "xpos": word.xpos,
-                        "feats": word.feats,
-                        "head": word.head,
-                        "deprel": word.deprel
-                    }
-                    sentence_info["words"].append(word_info)
-                    analysis["tokens"].append(word_info)
-                for word in sent.words:
-                    if word.head > 0:
-                        dependency = {
-                            "governor": word.head,
-                            "dependent": word.id,
-                            "relation": word.deprel
-                        }
-                        sentence_info["dependencies"].append(dependency)
-                        analysis["dependencies"].append(dependency)
-                analysis["sentences"].append(sentence_info)
-            return analysis
+            return self.analysis_from_stanza_doc(self.stanza_nlp(sentence))
         except Exception as e:
             return {"error": str(e)}
 
-    def find_subject_with_stanza(self, analysis: Dict) -> Tuple[str, str]:
-        if "error" in analysis or not analysis.get("sentences"):
+    def analysis_from_stanza_doc(self, doc) -> TokenTable:
+        """Преобразует документ Stanza в компактную таблицу токенов
+
+        Таблица читается как прежний словарь синтаксического анализа
+        {"sentences", "tokens", "dependencies"}.
+        """
+        return TokenTable.from_stanza_doc(doc)
+
+    def build_analysis_context(self, sentence: str, stanza_doc=None) -> SentenceAnalysisContext:
+        """Однократный анализ предложения: Stanza (если её выбрал маршрутизатор), токены, морфология"""
+        context = self._new_analysis_context(sentence)
+        if not self.STANZA_AVAILABLE:
+            self.analysis_router.record(context, "morph", "no_stanza")
+        elif stanza_doc is not None:
+            self.analysis_router.record(context, "stanza")
+            context.set_stanza_analysis(stanza_doc, self.analysis_from_stanza_doc(stanza_doc))
+        elif not self.stanza_nlp:
+            self.analysis_router.record(context, "morph", "no_stanza")
+            context.set_stanza_analysis(None, {"error": "Stanza analyzer not available"})
+        elif self._needs_stanza(context):
+            self._run_stanza(context)
+        return context
+
+    def build_analysis_contexts(self, sentences: List[str]) -> List[SentenceAnalysisContext]:
+        """Анализ нескольких предложений: выбранные для Stanza — одним пакетным вызовом"""
+        if not (self.STANZA_AVAILABLE and self.stanza_nlp):
+            return [self.build_analysis_context(s) for s in sentences]
+        contexts = [self._new_analysis_context(s) for s in sentences]
+        routed = [context for context in contexts if self._needs_stanza(context)]
+        if len(routed) > 1:
+            try:
+                import stanza
+                with self.timings.stage("stanza"):
+                    docs = self.stanza_nlp([stanza.Document([], text=c.sentence) for c in routed])
+                for context, doc in zip(routed, docs):
+                    context.set_stanza_analysis(doc, self.analysis_from_stanza_doc(doc))
+                return contexts
+            except Exception as e:
+                print(f"Ошибка пакетного анализа Stanza, анализируем по одному: {e}")
+        for context in routed:
+            self._run_stanza(context)
+        return contexts
+
+    def _new_analysis_context(self, sentence: str) -> SentenceAnalysisContext:
+        morph_cache = self.morph_cache if self.MORPH_AVAILABLE else None
+        return SentenceAnalysisContext(sentence.strip(), morph_cache=morph_cache)
+
+    def _needs_stanza(self, context: SentenceAnalysisContext) -> bool:
+        return self.analysis_router.needs_stanza(context, lambda word: self.is_verb_simple(word, context))
+
+    def _run_stanza(self, context: SentenceAnalysisContext):
+        try:
+            with self.timings.stage("stanza"):
+                stanza_doc = self.stanza_nlp(context.sentence)
+            context.set_stanza_analysis(stanza_doc, self.analysis_from_stanza_doc(stanza_doc))
+        except Exception as e:
+            context.set_stanza_analysis(None, {"error": str(e)})
+
+    def build_paragraph_contexts(self, paragraph: str) -> List[SentenceAnalysisContext]:
+        """Анализ абзаца одним вызовом Stanza с делением на предложения по её разметке
+
+        Без Stanza абзац делится на предложения функцией iter_sentences.
+        """
+        text = paragraph.strip()
+        # Адаптивный режим решает для каждого предложения отдельно
+        if self.STANZA_AVAILABLE and self.stanza_nlp and self.analysis_router.mode == "stanza":
+            try:
+                with self.timings.stage("stanza"):
+                    doc = self.stanza_nlp(text)
+            except Exception as e:
+                print(f"Ошибка анализа абзаца Stanza, делим его на предложения без неё: {e}")
+            else:
+                contexts = []
+                for sent in doc.sentences:
+                    context = self._new_analysis_context(sent.text)
+                    self.analysis_router.record(context, "stanza")
+                    # Вместо документа в контексте хранится предложение Stanza — его часть разбора
+                    context.set_stanza_analysis(sent, TokenTable.from_stanza_sentences([sent]))
+                    contexts.append(context)
+                return contexts
+        return self.build_analysis_contexts(list(iter_sentences([text])))
+
+    def analyze_word(self, word: str, context: Optional[SentenceAnalysisContext] = None) -> MorphAnalysis:
+        """Морфологический разбор через общий кэш; все потребители pymorphy2 идут сюда"""
+        with self.timings.stage("morphology"):
+            if context is not None:
+                return context.analyze(word)
+            return self.morph_cache.analyze(word)
+
+    def find_subject_with_stanza(self, analysis: TokenTable) -> Tuple[str, str]:
+        if "error" in analysis or not analysis.sentence_spans:
             return None, None
+        texts, upos, deprels = analysis.texts, analysis.upos, analysis.deprels
         subject = None
         predicate = None
-        for sentence in analysis["sentences"]:
-            for word in sentence["words"]:
-                if word["deprel"] == "nsubj":
-                    subject = word["text"]
-                elif word["deprel"] == "root" and word["upos"] == "VERB":
-                    predicate = word["text"]
-                elif word["deprel"] in ["nsubj:pass", "csubj"]:
-                    subject = word["text"]
+        for index in analysis.sentence_indexes():
+            # При нескольких кандидатах побеждает последний по порядку слов
+            position = index.last("nsubj", "nsubj:pass", "csubj")
+            if position is not None:
+                subject = texts[position]
+            roots = [i for i in index.by_deprel.get("root", ()) if upos[i] == "VERB"]
+            if roots:
+                predicate = texts[roots[-1]]
             if not subject or not predicate:
-                for word in sentence["words"]:
-                    if word["upos"] == "NOUN" and word["deprel"] != "obj":
-                        subject = word["text"]
-                    elif word["upos"] == "VERB" and not predicate:
-                        predicate = word["text"]
+                nouns = [i for i in index.by_upos.get("NOUN", ()) if deprels[i] != "obj"]
+                if nouns:
+                    subject = texts[nouns[-1]]
+                verbs = index.by_upos.get("VERB")
+                if verbs and not predicate:
+                    predicate = texts[verbs[0]]
         return subject, predicate
 
-    def find_objects_with_stanza(self, analysis: Dict) -> Tuple[str, str]:
-        if "error" in analysis or not analysis.get("sentences"):
+    def find_objects_with_stanza(self, analysis: TokenTable) -> Tuple[str, str]:
+        if "error" in analysis or not analysis.sentence_spans:
             return None, None
+        texts = analysis.texts
         direct_object = None
         indirect_object = None
-        for sentence in analysis["sentences"]:
-            for word in sentence["words"]:
-                if word["deprel"] == "obj":
-                    direct_object = word["text"]
-                elif word["deprel"] == "iobj":
-                    indirect_object = word["text"]
-                elif word["deprel"] in ["obl", "nmod"]:
-                    if not direct_object:
-                        direct_object = word["text"]
+        for index in analysis.sentence_indexes():
+            # obj всегда важнее obl/nmod, а obl/nmod берётся первый и только без obj
+            position = index.last("obj")
+            if position is None and not direct_object:
+                position = index.first("obl", "nmod")
+            if position is not None:
+                direct_object = texts[position]
+            position = index.last("iobj")
+            if position is not None:
+                indirect_object = texts[position]
         return direct_object, indirect_object
 
-    def advanced_syntax_analysis_with_stanza(self, structure: Dict, sentence: str):
-        stanza_analysis = self.stanza_syntax_analysis(sentence)
+    def advanced_syntax_analysis_with_stanza(self, structure: Dict, sentence: str,
+                                             context: Optional[SentenceAnalysisContext] = None):
+        if context is not None:
+            stanza_analysis = context.stanza_analysis or {"error": "Stanza analyzer not available"}
+        else:
+            stanza_analysis = self.stanza_syntax_analysis(sentence)
         if "error" not in stanza_analysis:
             structure["stanza_analysis"] = stanza_analysis
             subject, predicate = self.find_subject_with_stanza(stanza_analysis)
@@ -194,9 +478,10 @@ class AdvancedTransformationalTranslator:
             if indirect_obj:
                 structure["indirect_object"] = indirect_obj
             return
-        self.fallback_syntax_analysis(structure, sentence)
+        self.fallback_syntax_analysis(structure, sentence, context)
 
-    def fallback_syntax_analysis(self, structure: Dict, sentence: str):
+    def fallback_syntax_analysis(self, structure: Dict, sentence: str,
+                                 context: Optional[SentenceAnalysisContext] = None):
         clean_sentence = re.sub(r'[^\w\s]', ' ', sentence)
         words = [word for word in clean_sentence.strip().split() if word]
         question_words = ['что', 'кто', 'где', 'когда', 'почему', 'как', 'сколько']
@@ -205,7 +490,7 @@ class AdvancedTransformationalTranslator:
                 structure["question_word"] = word
                 break
         for word in words:
-            if self.is_verb_simple(word):
+            if self.is_verb_simple(word, context):
                 structure["verb"] = word
                 break
         for word in words:
@@ -216,16 +501,14 @@ class AdvancedTransformationalTranslator:
             verb_index = words.index(structure["verb"])
             for i in range(verb_index + 1, len(words)):
                 word = words[i]
-                if word != structure.get("subject") and not self.is_verb_simple(word):
+                if word != structure.get("subject") and not self.is_verb_simple(word, context):
                     structure["object"] = word
                     break
 
-    def is_verb_simple(self, word: str) -> bool:
+    def is_verb_simple(self, word: str, context: Optional[SentenceAnalysisContext] = None) -> bool:
         if self.MORPH_AVAILABLE and self.morph:
-            parses = self.morph.parse(word)
-            for p in parses:
-                if p.tag.POS in {'VERB', 'INFN'}:
-                    return True
+            if self.analyze_word(word, context).is_verb:
+                return True
         word_lower = word.lower()
         verb_endings = [
             'ть', 'ет', 'ёт', 'ит', 'ат', 'ят',
@@ -237,83 +520,154 @@ class AdvancedTransformationalTranslator:
         special_verbs = ['есть', 'быть', 'являться', 'стать', 'казаться']
         return any(word_lower.endswith(ending) for ending in verb_endings) or word_lower in special_verbs
 
+    # Предлоги, указывающие на обстоятельство места (SVA, SVOA)
+    PREPOSITIONS = frozenset({'в', 'во', 'на', 'у', 'с', 'к', 'из', 'без', 'о', 'об', 'за', 'по'})
+    # Глаголы передачи, допускающие косвенное дополнение (SVOO)
+    DATIVE_VERBS = frozenset({"дал", "дала", "дало", "дали", "дать", "подарил", "подарила", "отдал", "отдала",
+                              "передал", "передала"})
+
+    # Служебные слова, которые отбрасываются из многословного перевода
+    TRANSLATION_STOP_WORDS = frozenset({'i', 'you', 'he', 'she', 'it', 'we', 'they',
+                                        'am', 'is', 'are', 'was', 'were',
+                                        'do', 'does', 'did',
+                                        'have', 'has', 'had',
+                                        'be', 'been', 'being'})
+
+    def _lookup_local_translation(self, word: str) -> Optional[str]:
+        """Перевод из локальных источников без обращения к сети"""
+        word_lower = word.lower()
+        # Проверяем лексические исправления из JSON (сведены в один словарь)
+        if self.json_loaded:
+            result = self.ruleset.lexicon.get(word_lower)
+            if result is not None:
+                return result
+        # Используем correction_dict
+        result = self.correction_dict.get(word_lower)
+        # Офлайн-словарь: перевод приводится к тому же виду, что и сетевой
+        if result is None and self.lexicon is not None:
+            result = self.lexicon.get(word_lower)
+            if result is not None:
+                result = self._postprocess_translation(word_lower, result)
+        return result
+
+    def _postprocess_translation(self, word: str, raw: str) -> str:
+        """Оставляет одно значимое слово из многословного перевода"""
+        raw = raw.lower().strip()
+        if ' ' in raw:
+            candidates = [w for w in raw.split() if w not in self.TRANSLATION_STOP_WORDS]
+            return candidates[0] if candidates else word
+        return raw
+
+    def _translate_raw_batch(self, words: List[str]) -> List[Optional[str]]:
+        """Сырые переводы слов одним запросом к бэкенду, None — для неудавшихся"""
+        try:
+            with self.timings.stage("backend"):
+                return self.backend.translate_batch(words)
+        except BackendError as e:
+            print(f"Ошибка бэкенда перевода {self.backend_name} ({len(words)} слов): {e}")
+            return [None] * len(words)
+
+    def translate_words(self, words) -> Dict[str, str]:
+        """Переводит набор слов, отправляя все промахи кэшей одним запросом"""
+        timings = self.timings
+        results = {}
+        misses = []
+        for word in dict.fromkeys(words):
+            if word in self.translation_cache:
+                timings.count("translation_cache_hits")
+                results[word] = self.translation_cache[word]
+                continue
+            result = self._lookup_local_translation(word)
+            if result is not None:
+                timings.count("local_hits")
+            # Дисковый кэш сетевых переводов
+            elif self.persistent_cache is not None:
+                try:
+                    result = self.persistent_cache.get(word, self.backend_name, self.target_language)
+                except sqlite3.Error as e:
+                    # Например, «database is locked», когда файл кэша делят несколько процессов
+                    print(f"Ошибка чтения кэша переводов: {e}", file=sys.stderr)
+                timings.count("persistent_cache_hits" if result is not None else "persistent_cache_misses")
+            if result is None:
+                misses.append(word)
+                continue
+            self.translation_cache[word] = result
+            results[word] = result
+
+        if misses:
+            translated = []
+            # В офлайн-режиме слова без локального перевода остаются как есть
+            timings.count("backend_words", 0 if self.offline else len(misses))
+            raw_results = [None] * len(misses) if self.offline else self._translate_raw_batch(misses)
+            for word, raw in zip(misses, raw_results):
+                if raw is None:
+                    result = word
+                else:
+                    result = self._postprocess_translation(word, raw)
+                    translated.append((word, result))
+                self.translation_cache[word] = result
+                results[word] = result
+            if translated and self.persistent_cache is not None:
+                try:
+                    self.persistent_cache.put_many(translated, self.backend_name, self.target_language)
+                except sqlite3.Error as e:
+                    # Запись пропускается: переводы остаются в кэше в памяти
+                    print(f"Ошибка записи в кэш переводов: {e}", file=sys.stderr)
+        return results
+
     def _safe_translate_word(self, word: str) -> str:
         if word in self.translation_cache:
+            self.timings.count("translation_cache_hits")
             return self.translation_cache[word]
-        try:
-            # Проверяем лексические исправления из JSON
-            if self.json_loaded and self.lexical_corrections:
-                for category in self.lexical_corrections.values():
-                    if word.lower() in category:
-                        result = category[word.lower()]
-                        self.translation_cache[word] = result
-                        return result
-
-            # Используем correction_dict
-            word_lower = word.lower()
-            if word_lower in self.correction_dict:
-                result = self.correction_dict[word_lower]
-                self.translation_cache[word] = result
-                return result
+        return self.translate_words([word])[word]
 
-            # Обычный перевод
-            raw = self.translator.translate(word).lower().strip()
-            if ' ' in raw:
-                stop_words = {'i', 'you', 'he', 'she', 'it', 'we', 'they',
-                              'am', 'is', 'are', 'was', 'were',
-                              'do', 'does', 'did',
-                              'have', 'has', 'had',
-                              'be', 'been', 'being'}
-                candidates = [w for w in raw.split() if w not in stop_words]
-                result = candidates[0] if candidates else word
+    def _lookup_forms(self, words, context: Optional[SentenceAnalysisContext] = None) -> List[str]:
+        """Формы, которые понадобятся при переводе: нормальные формы и инфинитивы"""
+        forms = []
+        for word in words:
+            if self.MORPH_AVAILABLE and self.morph:
+                analysis = self.analyze_word(word, context)
+                if analysis.normal_form is not None:
+                    forms.append(analysis.normal_form)
+                if analysis.is_verb:
+                    forms.append(analysis.verb_infinitive)
             else:
-                result = raw
-            self.translation_cache[word] = result
-            return result
-        except:
-            self.translation_cache[word] = word
-            return word
+                forms.append(word)
+        return forms
 
-    def get_verb_info(self, russian_verb: str) -> dict:
+    def prefetch_translations(self, words, context: Optional[SentenceAnalysisContext] = None) -> Dict[str, str]:
+        """Переводит нормальные формы и инфинитивы всех слов одним пакетом"""
+        return self.translate_words(self._lookup_forms(words, context))
+
+    def get_verb_info(self, russian_verb: str, context: Optional[SentenceAnalysisContext] = None) -> dict:
         if self.MORPH_AVAILABLE and self.morph:
-            parses = self.morph.parse(russian_verb)
-            for p in parses:
-                if p.tag.POS in {'VERB', 'INFN'}:
-                    normal_form = p.normal_form
-                    tense = getattr(p.tag, 'tense', None)
-                    return {"infinitive": normal_form, "tense": tense}
+            analysis = self.analyze_word(russian_verb, context)
+            if analysis.is_verb:
+                return {"infinitive": analysis.verb_infinitive, "tense": analysis.verb_tense}
         return {"infinitive": russian_verb, "tense": None}
 
-    def get_word_translation_improved(self, word: str) -> str:
+    def get_word_translation_improved(self, word: str, context: Optional[SentenceAnalysisContext] = None) -> str:
         if self.MORPH_AVAILABLE and self.morph:
-            parses = self.morph.parse(word)
-            if parses:
-                p = parses[0]
-                normal_form = p.normal_form
-                return self._safe_translate_word(normal_form)
+            analysis = self.analyze_word(word, context)
+            if analysis.normal_form is not None:
+                return self._safe_translate_word(analysis.normal_form)
         return self._safe_translate_word(word)
 
+    def find_triggers(self, sentence: str, context: Optional[SentenceAnalysisContext] = None) -> List[str]:
+        """Расширенные шаблоны, чьи триггеры есть в предложении; результат запоминается в контексте"""
+        if context is not None and context.triggers is not None:
+            return context.triggers
+        triggers = self.ruleset.trigger_matcher.match(sentence.lower())
+        if context is not None:
+            context.triggers = triggers
+        return triggers
+
     def detect_special_pattern(self, sentence: str, structure: Dict) -> str:
         """Определяет специальную конструкцию по шаблонам из JSON"""
-        sentence_lower = sentence.lower()
-
-        # 1. POSSESSION: "У меня есть..."
-        if self.extended_patterns and "POSSESSION" in self.extended_patterns:
-            possession_pattern = self.extended_patterns["POSSESSION"].get("trigger_regex")
-            if possession_pattern and re.search(possession_pattern, sentence_lower):
-                return "POSSESSION"
-
-        # 2. PRICE_QUESTION: "Сколько стоит..."
-        if self.extended_patterns and "PRICE_QUESTION" in self.extended_patterns:
-            price_pattern = self.extended_patterns["PRICE_QUESTION"].get("trigger_regex")
-            if price_pattern and re.search(price_pattern, sentence_lower):
-                return "PRICE_QUESTION"
-
-        # 3. PHRASAL_VERB: "ждать", "смотреть", "идти"
-        if self.extended_patterns and "PHRASAL_VERB" in self.extended_patterns:
-            trigger_verbs = self.extended_patterns["PHRASAL_VERB"].get("trigger_verbs", [])
-            if any(verb in sentence_lower for verb in trigger_verbs):
-                return "PHRASAL_VERB"
+        # Расширенные шаблоны (POSSESSION, PRICE_QUESTION, PHRASAL_VERB...) — в порядке JSON
+        triggers = self.find_triggers(sentence, structure.get("context"))
+        if triggers:
+            return triggers[0]
 
         # Стандартные шаблоны
         has_subject = structure.get("subject") is not None
@@ -322,9 +676,8 @@ class AdvancedTransformationalTranslator:
         has_indirect = structure.get("indirect_object") is not None
 
         adverbial_found = False
-        prepositions = {'в', 'во', 'на', 'у', 'с', 'к', 'из', 'без', 'о', 'об', 'за', 'по'}
         for word in structure["words_ru"]:
-            if word.lower() in prepositions:
+            if word.lower() in self.PREPOSITIONS:
                 adverbial_found = True
                 break
 
@@ -332,9 +685,7 @@ class AdvancedTransformationalTranslator:
             return "SV"
 
         verb = structure.get("verb", "").lower()
-        dative_verbs = {"дал", "дала", "дало", "дали", "дать", "подарил", "подарила", "отдал", "отдала", "передал",
-                        "передала"}
-        if has_indirect and has_object and verb in dative_verbs:
+        if has_indirect and has_object and verb in self.DATIVE_VERBS:
             return "SVOO"
 
         if has_object and adverbial_found:
@@ -370,29 +721,23 @@ class AdvancedTransformationalTranslator:
     def determine_sentence_pattern(self, structure: Dict, sentence: str) -> str:
         return self.detect_special_pattern(sentence, structure)
 
-    def parse_russian_sentence_improved(self, sentence: str) -> Dict:
-        original = sentence.strip()
-        words = []
-
-        if self.STANZA_AVAILABLE:
-            stanza_analysis = self.stanza_syntax_analysis(original)
-            if "error" not in stanza_analysis:
-                for sent in stanza_analysis.get("sentences", []):
-                    for word in sent.get("words", []):
-                        words.append(word["text"])
-            else:
-                clean = re.sub(r'[^\w\s]', ' ', original)
-                words = [w for w in clean.strip().split() if w]
-        else:
-            clean = re.sub(r'[^\w\s]', ' ', original)
-            words = [w for w in clean.strip().split() if w]
-
-        punctuation_marks = {'?', '!', '.', ',', ';', ':', '"', "'", '»', '«', '(', ')'}
-        words = [w for w in words if w not in punctuation_marks]
-
-        word_translations = {}
+    def parse_russian_sentence_improved(self, sentence: str,
+                                        context: Optional[SentenceAnalysisContext] = None) -> Dict:
+        timings = self.timings
+        if context is None:
+            with timings.stage("analysis"):
+                context = self.build_analysis_context(sentence)
+        self._check_cancelled()
+        original = context.sentence
+        words = context.tokens
+
+        # Все промахи кэша предложения переводятся одним запросом
+        with timings.stage("lookup"):
+            self.prefetch_translations(words, context)
+        self._check_cancelled()
+        word_translations = context.translations
         for word in words:
-            word_translations[word] = self.get_word_translation_improved(word)
+            word_translations[word] = self.get_word_translation_improved(word, context)
 
         structure = {
             "original": original,
@@ -408,11 +753,13 @@ class AdvancedTransformationalTranslator:
             "adverbs": [],
             "question_word": None,
             "punctuation": self.extract_punctuation(original),
-            "stanza_used": self.STANZA_AVAILABLE,
-            "morph_used": self.MORPH_AVAILABLE
+            "stanza_used": context.stanza_ok,
+            "morph_used": self.MORPH_AVAILABLE,
+            "context": context
         }
 
-        self.advanced_syntax_analysis_with_stanza(structure, original)
+        with timings.stage("syntax"):
+            self.advanced_syntax_analysis_with_stanza(structure, original, context)
 
         # Постобработка вопросительных слов
         if structure["type"] == "interrogative" and not structure.get("question_word"):
@@ -423,52 +770,42 @@ class AdvancedTransformationalTranslator:
                     break
         if structure["type"] == "interrogative" and "сколько" in sentence.lower():
             # Разбираем структуру "Сколько стоит/стоят X?"
-            words_lower = [w.lower() for w in structure["words_ru"]]
-
-            if "сколько" in words_lower:
-                сколько_index = words_lower.index("сколько")
-
+            сколько_positions = context.lower_positions.get("сколько")
+            if сколько_positions:
                 # Ищем глагол "стоит" или "стоят"
-                for i in range(сколько_index + 1, len(structure["words_ru"])):
-                    word_lower = structure["words_ru"][i].lower()
-                    if word_lower in ["стоит", "стоят"]:
-                        # Следующее слово после глагола - это объект
-                        if i + 1 < len(structure["words_ru"]):
-                            next_word = structure["words_ru"][i + 1]
-                            # Проверяем, что это не знак препинания
-                            if next_word not in ['?', '!', '.', ',']:
-                                structure["object"] = next_word
-                        break
+                i = first_position_after(context.lower_positions, ("стоит", "стоят"), сколько_positions[0])
+                if i is not None:
+                    # Следующее слово после глагола - это объект
+                    if i + 1 < len(structure["words_ru"]):
+                        next_word = structure["words_ru"][i + 1]
+                        # Проверяем, что это не знак препинания
+                        if next_word not in ['?', '!', '.', ',']:
+                            structure["object"] = next_word
 
         # Обработка косвенного дополнения
         if structure["verb"]:
             verb_clean = structure["verb"].lower()
-            dative_verbs = {"дал", "дала", "дало", "дали", "дать", "подарил", "подарила", "отдал", "отдала", "передал",
-                            "передала"}
-            if verb_clean in dative_verbs:
-                verb_index = None
-                for i, word in enumerate(structure["words_ru"]):
-                    if word == structure["verb"]:
-                        verb_index = i
-                        break
-                candidates = []
+            if verb_clean in self.DATIVE_VERBS:
+                verb_index = context.positions.get(structure["verb"])
+                # Косвенное дополнение — первое слово после глагола, не являющееся прямым
+                candidate = None
                 if verb_index is not None:
-                    for i in range(verb_index + 1, len(structure["words_ru"])):
-                        word = structure["words_ru"][i]
-                        if word == structure.get("object"):
-                            continue
-                        candidates.append(word)
-                if structure.get("object") and len(candidates) >= 1:
-                    structure["indirect_object"] = candidates[0]
+                    for word in structure["words_ru"][verb_index + 1:]:
+                        if word != structure.get("object"):
+                            candidate = word
+                            break
+                if structure.get("object") and candidate is not None:
+                    structure["indirect_object"] = candidate
 
         if structure["verb"]:
-            verb_info = self.get_verb_info(structure["verb"])
+            verb_info = self.get_verb_info(structure["verb"], context)
             structure["verb_tense"] = verb_info["tense"]
             verb_inf_en = self._safe_translate_word(verb_info["infinitive"])
             structure["word_translations"][structure["verb"]] = verb_inf_en
             structure["words_en"] = [structure["word_translations"].get(w, w) for w in structure["words_ru"]]
 
         structure["pattern"] = self.determine_sentence_pattern(structure, original)
+        context.pattern = structure["pattern"]
         return structure
 
     def detect_sentence_type(self, sentence: str) -> str:
@@ -508,33 +845,35 @@ class AdvancedTransformationalTranslator:
 
         # Специальная обработка для "сколько"
         if question_word == "сколько":
-            pattern = self.detect_special_pattern(en_structure["original"], en_structure)
+            # Шаблон уже определён при разборе предложения
+            context = en_structure.get("context")
+            pattern = context.pattern if context is not None else None
+            if pattern is None:
+                pattern = self.detect_special_pattern(en_structure["original"], en_structure)
 
             if pattern == "PRICE_QUESTION":
                 # Получаем объект разными способами
                 obj_ru = en_structure.get("object")
 
+                words_ru = en_structure.get("words_ru", [])
+                positions = context.lower_positions if context is not None else index_tokens(words_ru)
+
                 # Способ 1: Из структуры
                 if not obj_ru:
-                    # Способ 2: Из анализа слов
-                    words_ru = en_structure.get("words_ru", [])
-                    for i, word in enumerate(words_ru):
-                        if word.lower() == "сколько" and i + 2 < len(words_ru):
-                            # Пропускаем "стоит/стоят"
+                    # Способ 2: Из анализа слов — через слово после "сколько" (пропускаем "стоит/стоят")
+                    for i in positions.get("сколько", ()):
+                        if i + 2 < len(words_ru):
                             obj_ru = words_ru[i + 2]
                             break
 
                 # Способ 3: Находим первое существительное после глагола
                 if not obj_ru:
-                    verb_found = False
-                    words_ru = en_structure.get("words_ru", [])
-                    for word in words_ru:
-                        if word.lower() in ["стоит", "стоят"]:
-                            verb_found = True
-                            continue
-                        if verb_found and word not in ["сколько", "?"]:
-                            obj_ru = word
-                            break
+                    verb_index = first_position_after(positions, ("стоит", "стоят"))
+                    if verb_index is not None:
+                        for word in words_ru[verb_index + 1:]:
+                            if word.lower() not in ("стоит", "стоят") and word not in ("сколько", "?"):
+                                obj_ru = word
+                                break
 
                 # Если объект не найден
                 if not obj_ru:
@@ -643,130 +982,98 @@ class AdvancedTransformationalTranslator:
     def build_improved_statement(self, en_structure: Dict) -> str:
         pattern = en_structure.get("pattern", "SVO")
 
-        # Проверяем специальные шаблоны из JSON
-        if self.json_loaded and self.extended_patterns and pattern in self.extended_patterns:
+        # Специальные шаблоны из JSON
+        if pattern in self.ruleset.extended_realizers:
             return self.generate_from_json_template(en_structure, pattern)
 
         # Стандартные шаблоны
         return self.generate_from_basic_pattern(en_structure, pattern)
 
+    def _article_slot(self, en_structure: Dict, word_ru: str) -> str:
+        """Артикль вместе с пробелом после него — так он стоит в шаблонах"""
+        article = self.determine_article(en_structure, word_ru)
+        return article + " " if article else ""
+
+    def _location_slot(self, en_structure: Dict, obj_ru: str) -> str:
+        """Место — слово после последнего предлога места"""
+        words_ru = en_structure["words_ru"]
+        place_ru = None
+        for idx in range(len(words_ru) - 1):
+            word_ru = words_ru[idx]
+            if word_ru != obj_ru and word_ru.lower() in ["в", "во", "на", "у"]:
+                place_ru = words_ru[idx + 1]
+        if place_ru is None:
+            return ""
+        return f" in the {en_structure['word_translations'].get(place_ru, place_ru)}"
+
     def generate_from_json_template(self, en_structure: Dict, pattern: str) -> str:
         """Генерация предложения строго по шаблону из JSON"""
+        realizer = self.ruleset.extended_realizers.get(pattern)
+        if realizer is None:
+            return self.generate_from_basic_pattern(en_structure, pattern)
         template_config = self.extended_patterns[pattern]
-        template = template_config.get("template", "{subject} {verb}")
-
-        # Базовые компоненты
-        components = {}
+        translations = en_structure["word_translations"]
+        obj_ru = en_structure.get("object") or ""
 
-        # Подлежащее и глагол
         if pattern == "POSSESSION":
-            subject_ru = en_structure.get("subject", "").lower()
-            subject_data = template_config["subject_mapping"].get(subject_ru, {"subject": subject_ru, "verb": "have"})
-            components["subject"] = subject_data["subject"]
-            components["verb"] = subject_data["verb"]
-
-            # Объект
-            obj_ru = en_structure.get("object", "")
-            obj_en = en_structure["word_translations"].get(obj_ru, obj_ru)
-            article = self.determine_article(en_structure, obj_ru)
-            components["object"] = (article + " " + obj_en).strip() if article else obj_en
-
-            # Место
-            location = ""
-            for word_ru in en_structure["words_ru"]:
-                if word_ru.lower() in ["в", "во", "на", "у"] and word_ru != obj_ru:
-                    idx = en_structure["words_ru"].index(word_ru)
-                    if idx + 1 < len(en_structure["words_ru"]):
-                        place_ru = en_structure["words_ru"][idx + 1]
-                        place_en = en_structure["word_translations"].get(place_ru, place_ru)
-                        location = f" in the {place_en}"
-            components["location"] = location
-
-            try:
-                result = template.format(**components)
-                return result + en_structure["punctuation"]
-            except KeyError as e:
-                pass
-
-        elif pattern == "PHRASAL_VERB":
-            subject_ru = en_structure.get("subject", "").lower()
-            subject_en = self.correction_dict.get(subject_ru,
-                                                  en_structure["word_translations"].get(en_structure.get("subject", ""),
-                                                                                        subject_ru))
-            components["subject"] = subject_en.capitalize()
-
-            verb_ru = en_structure.get("verb", "").lower()
-            verb_mapping = template_config.get("verb_mapping", {})
-            verb_data = verb_mapping.get(verb_ru, {"verb_phrase": verb_ru})
-            components["verb_phrase"] = verb_data["verb_phrase"]
-
-            obj_ru = en_structure.get("object", "")
-            components["object"] = en_structure["word_translations"].get(obj_ru, obj_ru)
-
-            # Место
-            location = ""
-            for word_ru in en_structure["words_ru"]:
-                if word_ru.lower() in ["в", "во", "на", "у"] and word_ru != obj_ru:
-                    idx = en_structure["words_ru"].index(word_ru)
-                    if idx + 1 < len(en_structure["words_ru"]):
-                        place_ru = en_structure["words_ru"][idx + 1]
-                        place_en = en_structure["word_translations"].get(place_ru, place_ru)
-                        location = f" in the {place_en}"
-            components["location"] = location
-
-            try:
-                result = template.format(**components)
-                return result + en_structure["punctuation"]
-            except KeyError as e:
-                pass
-
-        # Если что-то пошло не так, fallback
-        return self.generate_from_basic_pattern(en_structure, pattern)
+            subject_ru = (en_structure.get("subject") or "").lower()
+            subject_data = template_config.get("subject_mapping", {}).get(
+                subject_ru, {"subject": subject_ru, "verb": "have"})
+            components = {
+                "subject": subject_data["subject"],
+                "verb": subject_data["verb"],
+                "article": self._article_slot(en_structure, obj_ru) if obj_ru else "",
+                "object": translations.get(obj_ru, obj_ru),
+                "location": self._location_slot(en_structure, obj_ru),
+            }
+        else:  # PHRASAL_VERB
+            subject = en_structure.get("subject") or ""
+            subject_en = self.correction_dict.get(subject.lower(), translations.get(subject, subject.lower()))
+            verb_ru = (en_structure.get("verb") or "").lower()
+            verb_data = template_config.get("verb_mapping", {}).get(verb_ru, {"verb_phrase": verb_ru})
+            components = {
+                "subject": subject_en.capitalize(),
+                "verb_phrase": verb_data["verb_phrase"],
+                "object": translations.get(obj_ru, obj_ru),
+                "location": self._location_slot(en_structure, obj_ru),
+            }
+        return realizer(components) + en_structure["punctuation"]
 
     def generate_from_basic_pattern(self, en_structure: Dict, pattern: str) -> str:
-        words = []
-        if en_structure.get("subject"):
-            subj_ru = en_structure["subject"].lower()
-            subj_en = self.correction_dict.get(subj_ru, en_structure["word_translations"].get(en_structure["subject"],
-                                                                                              en_structure["subject"]))
-            words.append(subj_en.capitalize())
-        if en_structure.get("verb"):
-            verb_base = en_structure["word_translations"][en_structure["verb"]]
+        realizers = self.ruleset.basic_realizers
+        realizer = realizers.get(pattern) or realizers[None]
+        translations = en_structure["word_translations"]
+        components = dict.fromkeys(BASIC_SLOTS, "")
+
+        subject = en_structure.get("subject")
+        if subject:
+            subj_en = self.correction_dict.get(subject.lower(), translations.get(subject, subject))
+            components["subject"] = subj_en.capitalize()
+        verb = en_structure.get("verb")
+        if verb:
+            verb_base = translations[verb]
             # Согласование для 3-го лица
-            subject_ru = en_structure.get("subject", "").lower()
-            if subject_ru in ["он", "она", "оно", "папа", "мама", "учитель"]:
+            if (subject or "").lower() in ["он", "она", "оно", "папа", "мама", "учитель"]:
                 if verb_base == "have":
-                    verb_conj = "has"
+                    verb_base = "has"
                 elif verb_base == "do":
-                    verb_conj = "does"
+                    verb_base = "does"
                 else:
-                    verb_conj = verb_base + "s"
-                words.append(verb_conj)
-            else:
-                words.append(verb_base)
-        if pattern == "SVOO":
-            if en_structure.get("indirect_object"):
-                words.append(en_structure["word_translations"][en_structure["indirect_object"]])
-            if en_structure.get("object"):
-                article = self.determine_article(en_structure, en_structure["object"])
-                if article:
-                    words.append(article)
-                words.append(en_structure["word_translations"][en_structure["object"]])
-        elif pattern in ["SVOA", "SVO"]:
-            if en_structure.get("object"):
-                article = self.determine_article(en_structure, en_structure["object"])
-                if article:
-                    words.append(article)
-                words.append(en_structure["word_translations"][en_structure["object"]])
-            if pattern == "SVOA":
-                # Добавляем обстоятельства в конец
-                for word_ru in en_structure["words_ru"]:
-                    if word_ru in [en_structure.get("subject"), en_structure.get("verb"), en_structure.get("object")]:
-                        continue
-                    word_en = en_structure["word_translations"][word_ru]
-                    if word_ru.lower() not in ["в", "во", "на", "у"]:  # Пропускаем предлоги
-                        words.append(word_en)
-        return " ".join(words) + en_structure["punctuation"]
+                    verb_base += "s"
+            components["verb"] = verb_base
+        obj = en_structure.get("object")
+        if obj:
+            components["article"] = self._article_slot(en_structure, obj)
+            components["object"] = translations[obj]
+        if en_structure.get("indirect_object"):
+            components["indirect_object"] = translations[en_structure["indirect_object"]]
+        if pattern == "SVOA":
+            # Обстоятельства — все остальные слова, кроме предлогов, в конец
+            skipped = {subject, verb, obj}
+            components["adverbial"] = " ".join(
+                translations[word_ru] for word_ru in en_structure["words_ru"]
+                if word_ru not in skipped and word_ru.lower() not in ["в", "во", "на", "у"])
+        return realizer(components) + en_structure["punctuation"]
 
     def generate_english_sentence(self, en_structure: Dict) -> str:
         if en_structure["type"] == "interrogative":
@@ -774,10 +1081,84 @@ class AdvancedTransformationalTranslator:
         else:
             return self.build_improved_statement(en_structure)
 
-    def translate_with_analysis(self, russian_sentence: str) -> Dict:
-        ru_structure = self.parse_russian_sentence_improved(russian_sentence)
-        en_structure = self.transform_sentence_structure(ru_structure)
-        translation = self.generate_english_sentence(en_structure)
+    def memory_stamp(self) -> str:
+        """Штамп для памяти переводов: версия правил, доступные анализаторы и режим анализа"""
+        return (f"{self.ruleset.version}:{int(self.STANZA_AVAILABLE)}{int(self.MORPH_AVAILABLE)}:"
+                f"{self.analysis_router.mode}")
+
+    def translate_with_analysis(self, russian_sentence: str,
+                                context: Optional[SentenceAnalysisContext] = None,
+                                cancel: Optional[threading.Event] = None) -> Dict:
+        """Перевод предложения с результатами анализа
+
+        Установленный cancel прерывает перевод между этапами (после разбора
+        Stanza, после запроса переводов слов, после синтаксического анализа и
+        трансформации) исключением TranslationCancelled. Сам вызов Stanza и
+        уже отправленный запрос к бэкенду не прерываются.
+        """
+        with self._pinned_rules(), self._cancellable(cancel):
+            return self._translate_instrumented(russian_sentence, context)
+
+    @contextmanager
+    def _cancellable(self, cancel: Optional[threading.Event]):
+        """Делает cancel доступным этапам перевода в этом потоке"""
+        if cancel is None or hasattr(self._request, 'cancel'):
+            yield
+            return
+        self._request.cancel = cancel
+        try:
+            yield
+        finally:
+            del self._request.cancel
+
+    def _check_cancelled(self):
+        cancel = getattr(self._request, 'cancel', None)
+        if cancel is not None and cancel.is_set():
+            raise TranslationCancelled()
+
+    def _translate_instrumented(self, russian_sentence: str,
+                                context: Optional[SentenceAnalysisContext] = None) -> Dict:
+        if not self.instrument:
+            return self._translate_with_memory(russian_sentence, context)
+        timings = StageTimings()
+        morph_before = self.morph_cache.stats() if self.morph_cache is not None else None
+        self._request.timings = timings
+        try:
+            result = self._translate_with_memory(russian_sentence, context)
+        finally:
+            del self._request.timings
+        if morph_before is not None:
+            morph_after = self.morph_cache.stats()
+            timings.count("morph_cache_hits", morph_after["hits"] - morph_before["hits"])
+            timings.count("morph_cache_misses", morph_after["misses"] - morph_before["misses"])
+        # Копия: в памяти переводов результат хранится без замеров
+        return dict(result, timings=timings.as_dict())
+
+    def _translate_with_memory(self, russian_sentence: str,
+                               context: Optional[SentenceAnalysisContext] = None) -> Dict:
+        timings = self.timings
+        stamp = self.memory_stamp()
+        with timings.stage("memory"):
+            cached = self.translation_memory.get(russian_sentence, stamp)
+        if cached is not None:
+            timings.count("memory_hits")
+            return cached
+        timings.count("memory_misses")
+        result = self._translate_uncached(russian_sentence, context)
+        self.translation_memory.put(russian_sentence, stamp, result)
+        return result
+
+    def _translate_uncached(self, russian_sentence: str,
+                            context: Optional[SentenceAnalysisContext] = None) -> Dict:
+        timings = self.timings
+        with timings.stage("parse"):
+            ru_structure = self.parse_russian_sentence_improved(russian_sentence, context)
+        self._check_cancelled()
+        with timings.stage("transform"):
+            en_structure = self.transform_sentence_structure(ru_structure)
+        self._check_cancelled()
+        with timings.stage("generation"):
+            translation = self.generate_english_sentence(en_structure)
         return {
             "original": russian_sentence,
             "translation": translation,
@@ -794,9 +1175,111 @@ class AdvancedTransformationalTranslator:
                 "question_word": ru_structure["question_word"]
             },
             "stanza_used": ru_structure["stanza_used"],
+            "analysis_path": ru_structure["context"].analysis_path,
             "morph_used": ru_structure["morph_used"]
         }
 
+    def translate_batch(self, sentences: List[str], batch_size: int = 64) -> List[Dict]:
+        """Перевод списка предложений с пакетной обработкой
+
+        Повторяющиеся предложения переводятся один раз (дубликаты получают
+        тот же словарь результата), предложения из памяти переводов не
+        анализируются вовсе, каждый пакет анализируется одним вызовом
+        Stanza, а словарные запросы всего пакета отправляются вместе.
+        Результаты возвращаются в порядке входного списка; ошибка в одном
+        предложении не прерывает пакет и попадает в поле "error".
+        """
+        with self._pinned_rules():
+            return self._translate_batch(sentences, batch_size)
+
+    def _translate_batch(self, sentences: List[str], batch_size: int) -> List[Dict]:
+        stamp = self.memory_stamp()
+        results = {}
+        unique = []
+        for sentence in dict.fromkeys(sentences):
+            cached = self.translation_memory.get(sentence, stamp)
+            if cached is not None:
+                results[sentence] = cached
+            else:
+                unique.append(sentence)
+
+        for start in range(0, len(unique), batch_size):
+            chunk = unique[start:start + batch_size]
+            contexts = self.build_analysis_contexts(chunk)
+            results.update(zip(chunk, self._translate_contexts(chunk, contexts, stamp)))
+        return [results[sentence] for sentence in sentences]
+
+    def _translate_contexts(self, sentences: List[str], contexts: List[SentenceAnalysisContext],
+                            stamp: str) -> List[Dict]:
+        """Перевод проанализированных предложений; словарные запросы всех — одним пакетом"""
+        forms = []
+        for context in contexts:
+            forms.extend(self._lookup_forms(context.tokens, context))
+        self.translate_words(forms)
+
+        results = []
+        for sentence, context in zip(sentences, contexts):
+            try:
+                result = self._translate_uncached(sentence, context)
+                self.translation_memory.put(sentence, stamp, result)
+            except Exception as e:
+                result = {"original": sentence, "translation": None, "error": str(e)}
+            results.append(result)
+        return results
+
+    def translate_paragraph(self, paragraph: str) -> Dict:
+        """Перевод абзаца из нескольких предложений
+
+        Stanza вызывается один раз на весь абзац, её разбор делится на
+        предложения, и каждое предложение переводится отдельно — роли
+        одного предложения не перезаписываются словами другого. Предложения
+        из памяти переводов не переводятся заново. В режимах анализа, кроме
+        "stanza", абзац делится на предложения заранее, и Stanza получает
+        только выбранные маршрутизатором.
+        """
+        with self._pinned_rules():
+            return self._translate_paragraph(paragraph)
+
+    def _translate_paragraph(self, paragraph: str) -> Dict:
+        stamp = self.memory_stamp()
+        contexts = self.build_paragraph_contexts(paragraph)
+        results: List[Optional[Dict]] = []
+        pending = []
+        for context in contexts:
+            cached = self.translation_memory.get(context.sentence, stamp)
+            results.append(cached)
+            if cached is None:
+                pending.append(context)
+        translated = iter(self._translate_contexts([c.sentence for c in pending], pending, stamp))
+        results = [result if result is not None else next(translated) for result in results]
+        return {
+            "original": paragraph,
+            "translation": " ".join(r["translation"] for r in results if r.get("translation")),
+            "sentences": results,
+        }
+
+    def translate_stream(self, text: Union[str, Iterable[str]], batch_size: int = 8,
+                         cancel: Optional[threading.Event] = None) -> Iterator[Dict]:
+        """Перевод текста любой длины по предложениям
+
+        text — строка или итератор кусков текста (например, открытый файл).
+        Текст делится на предложения на лету, каждые batch_size предложений
+        переводятся через translate_batch и сразу выдаются; в памяти
+        держится только текущий пакет. Установленный cancel останавливает
+        перевод перед следующим пакетом.
+        """
+        chunks = [text] if isinstance(text, str) else text
+        batch = []
+        for sentence in iter_sentences(chunks):
+            batch.append(sentence)
+            if len(batch) >= batch_size:
+                if cancel is not None and cancel.is_set():
+                    return
+                yield from self.translate_batch(batch, batch_size)
+                batch = []
+        if batch and not (cancel is not None and cancel.is_set()):
+            yield from self.translate_batch(batch, batch_size)
+
 
 def demonstrate_stanza_translator():
     translator = AdvancedTransformationalTranslator()
@@ -0,0 +1,81 @@
+import threading
+from collections import OrderedDict
+from typing import Dict
+
+
+VERB_POS = frozenset({'VERB', 'INFN'})
+
+
+class MorphAnalysis:
+    """Сжатый результат разбора pymorphy2 для одной словоформы
+
+    pos, normal_form и граммемы берутся из самого вероятного разбора,
+    verb_infinitive и verb_tense — из первого глагольного разбора (если есть).
+    pos_confidence — доля оценки разборов с той же частью речи, что у первого.
+    """
+
+    __slots__ = ('word', 'pos', 'normal_form', 'tense', 'case', 'number', 'verb_infinitive', 'verb_tense',
+                 'pos_confidence')
+
+    def __init__(self, word: str, parses: list):
+        self.word = word
+        self.pos = self.normal_form = self.tense = self.case = self.number = None
+        self.verb_infinitive = self.verb_tense = None
+        self.pos_confidence = 0.0
+        if parses:
+            first = parses[0]
+            self.pos = first.tag.POS
+            self.normal_form = first.normal_form
+            self.tense = getattr(first.tag, 'tense', None)
+            self.case = getattr(first.tag, 'case', None)
+            self.number = getattr(first.tag, 'number', None)
+            total = sum(getattr(p, 'score', 0.0) for p in parses)
+            same = sum(getattr(p, 'score', 0.0) for p in parses if p.tag.POS == self.pos)
+            self.pos_confidence = same / total if total else 1.0
+        for p in parses:
+            if p.tag.POS in VERB_POS:
+                self.verb_infinitive = p.normal_form
+                self.verb_tense = getattr(p.tag, 'tense', None)
+                break
+
+    @property
+    def is_verb(self) -> bool:
+        return self.verb_infinitive is not None
+
+    def __repr__(self):
+        return f"MorphAnalysis({self.word!r}, pos={self.pos}, normal_form={self.normal_form!r})"
+
+
+class MorphCache:
+    """Общий ограниченный кэш морфологических разборов (LRU по словоформе)"""
+
+    def __init__(self, morph, max_size: int = 100000):
+        self.morph = morph
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[str, MorphAnalysis]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def analyze(self, word: str) -> MorphAnalysis:
+        with self._lock:
+            analysis = self._cache.get(word)
+            if analysis is not None:
+                self._cache.move_to_end(word)
+                self.hits += 1
+                return analysis
+            self.misses += 1
+        # Разбор выполняется вне блокировки: он заметно дольше обращения к словарю
+        analysis = MorphAnalysis(word, self.morph.parse(word))
+        with self._lock:
+            self._cache[word] = analysis
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return analysis
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
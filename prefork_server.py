@@ -0,0 +1,302 @@
+import argparse
+import asyncio
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Optional
+
+from analysis_router import ANALYSIS_MODES
+from corpus import set_torch_threads
+from main import AdvancedTransformationalTranslator
+from rules_watcher import RulesWatcher
+from server import serve
+from translation_cache import DEFAULT_CACHE_PATH
+
+
+# Воркер, упавший быстрее этого, перезапускается с паузой — чтобы не крутить fork в цикле
+MIN_WORKER_LIFETIME = 1.0
+
+
+def memory_usage(pid: int) -> Dict[str, int]:
+    """Память процесса в КБ: rss, pss, shared, private (Linux, /proc)
+
+    PSS делит общие страницы между процессами, которые их используют, поэтому
+    сумма PSS воркеров — реальная память, которую они занимают вместе.
+    """
+    usage = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if value.strip().endswith('kB'):
+                    usage[name] = int(value.split()[0])
+    except OSError:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return {"rss": int(line.split()[1])}
+        except OSError:
+            pass
+        return {}
+    return {
+        "rss": usage.get("Rss", 0),
+        "pss": usage.get("Pss", 0),
+        "shared": usage.get("Shared_Clean", 0) + usage.get("Shared_Dirty", 0),
+        "private": usage.get("Private_Clean", 0) + usage.get("Private_Dirty", 0),
+    }
+
+
+def exit_code(status: int) -> int:
+    """Код завершения из статуса waitpid; для сигнала — минус номер сигнала"""
+    if os.WIFEXITED(status):
+        return os.WEXITSTATUS(status)
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return status
+
+
+class PreforkServer:
+    """Мастер-процесс: загружает правила и модели один раз и держит N воркеров
+
+    Воркеры создаются через fork и наследуют загруженные словарь pymorphy2,
+    веса Stanza и правила; страницы памяти делятся по принципу copy-on-write.
+    До fork мастер ничего не переводит: пул потоков torch/OpenMP, запущенный
+    в родителе, после fork в детях не работает.
+
+    Сигналы мастеру:
+      SIGHUP          — плавный перезапуск воркеров по одному;
+      SIGUSR1         — отчёт о памяти воркеров в stderr;
+      SIGTERM, SIGINT — плавная остановка.
+    Если задан rules_watcher, мастер сам проверяет файл правил и после их
+    замены плавно перезапускает воркеры — новые наследуют новые правила.
+    """
+
+    def __init__(self, translator: AdvancedTransformationalTranslator, sock: socket.socket, workers: int,
+                 cache_path: Optional[str] = None, torch_threads: int = 1, max_batch: int = 32,
+                 max_delay: float = 0.005, drain_timeout: float = 10.0, report_interval: float = 0.0,
+                 rules_watcher: Optional[RulesWatcher] = None):
+        self.translator = translator
+        self.sock = sock
+        self.workers = workers
+        self.cache_path = cache_path
+        self.torch_threads = torch_threads
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.drain_timeout = drain_timeout
+        self.report_interval = report_interval
+        self.rules_watcher = rules_watcher
+        # pid → время запуска
+        self.children: Dict[int, float] = {}
+        # Воркеры, остановленные мастером намеренно
+        self._retiring = set()
+        self._stopping = False
+        self._restart_requested = False
+        self._report_requested = False
+
+    def prepare_for_fork(self):
+        """Закрывает ресурсы, которые нельзя делить между процессами, и замораживает кучу"""
+        if self.translator.persistent_cache is not None:
+            # Соединение SQLite нельзя использовать после fork — воркеры откроют своё
+            self.translator.persistent_cache.close()
+            self.translator.persistent_cache = None
+        # Открытые keep-alive соединения бэкенда не должны достаться нескольким воркерам
+        self.translator.backend.close()
+        # Сборщик мусора не должен трогать унаследованные объекты и копировать страницы
+        gc.collect()
+        gc.freeze()
+
+    def spawn_worker(self) -> int:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return pid
+        code = 0
+        try:
+            self._run_worker()
+        except BaseException as e:
+            print(f"Воркер {os.getpid()} завершился с ошибкой: {e}", file=sys.stderr)
+            code = 1
+        finally:
+            # Не возвращаемся в цикл мастера и не выполняем его обработчики выхода
+            os._exit(code)
+
+    def _run_worker(self):
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        # Сигналы терминала получает вся группа процессов — воркерами управляет мастер
+        for signum in (signal.SIGINT, signal.SIGHUP, signal.SIGUSR1):
+            signal.signal(signum, signal.SIG_IGN)
+        set_torch_threads(self.torch_threads)
+        if self.cache_path:
+            self.translator.init_persistent_cache(self.cache_path, preload=False)
+        asyncio.run(self._serve_worker())
+        if self.translator.persistent_cache is not None:
+            self.translator.persistent_cache.close()
+
+    async def _serve_worker(self):
+        stop = asyncio.Event()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        await serve(self.translator, sock=self.sock, max_batch=self.max_batch, max_delay=self.max_delay,
+                    stop=stop, drain_timeout=self.drain_timeout)
+
+    def _reap(self) -> List[int]:
+        """Собирает завершившиеся воркеры, возвращает их pid"""
+        finished = []
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            started = self.children.pop(pid, None)
+            if started is None:
+                continue
+            finished.append(pid)
+            if not self._stopping and pid not in self._retiring:
+                code = exit_code(status)
+                print(f"Воркер {pid} завершился (код {code}) — запускаю новый", file=sys.stderr)
+                if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                    time.sleep(MIN_WORKER_LIFETIME)
+            self._retiring.discard(pid)
+        return finished
+
+    def _wait_exit(self, pid: int, timeout: float):
+        deadline = time.monotonic() + timeout
+        while pid in self.children and time.monotonic() < deadline:
+            time.sleep(0.05)
+            self._reap()
+        if pid in self.children:
+            print(f"Воркер {pid} не завершился за {timeout:.0f} с — SIGKILL", file=sys.stderr)
+            self._signal(pid, signal.SIGKILL)
+            while pid in self.children:
+                time.sleep(0.05)
+                self._reap()
+
+    def _signal(self, pid: int, signum: int):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def restart_workers(self):
+        """Заменяет воркеры по одному: новый запускается раньше, чем останавливается старый"""
+        for pid in list(self.children):
+            if self._stopping:
+                return
+            self.spawn_worker()
+            self._retiring.add(pid)
+            self._signal(pid, signal.SIGTERM)
+            self._wait_exit(pid, self.drain_timeout + 5)
+        print("Воркеры перезапущены", file=sys.stderr)
+
+    def memory_report(self) -> str:
+        lines = [f"{'pid':>8} {'rss, МБ':>9} {'pss, МБ':>9} {'общая':>9} {'своя':>9}"]
+        total_pss = 0
+        for pid in [os.getpid()] + sorted(self.children):
+            usage = memory_usage(pid)
+            total_pss += usage.get("pss", 0)
+            role = " (мастер)" if pid == os.getpid() else ""
+            lines.append(f"{pid:>8} " + " ".join(f"{usage.get(key, 0) / 1024:>9.1f}"
+                                                 for key in ("rss", "pss", "shared", "private")) + role)
+        lines.append(f"Суммарно PSS: {total_pss / 1024:.1f} МБ")
+        return "\n".join(lines)
+
+    def _on_signal(self, signum, frame):
+        if signum == signal.SIGHUP:
+            self._restart_requested = True
+        elif signum == signal.SIGUSR1:
+            self._report_requested = True
+        else:
+            self._stopping = True
+
+    def run(self):
+        self.prepare_for_fork()
+        for signum in (signal.SIGHUP, signal.SIGUSR1, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self._on_signal)
+        for _ in range(self.workers):
+            self.spawn_worker()
+        print(f"Запущено воркеров: {self.workers} (мастер {os.getpid()})", file=sys.stderr)
+
+        next_report = time.monotonic() + self.report_interval
+        next_rules_check = time.monotonic()
+        while not self._stopping:
+            time.sleep(0.2)
+            self._reap()
+            while not self._stopping and len(self.children) < self.workers:
+                self.spawn_worker()
+            if self.rules_watcher is not None and time.monotonic() >= next_rules_check:
+                next_rules_check = time.monotonic() + self.rules_watcher.interval
+                if self.rules_watcher.check():
+                    self._restart_requested = True
+            if self._restart_requested:
+                self._restart_requested = False
+                self.restart_workers()
+            if self._report_requested or (self.report_interval and time.monotonic() >= next_report):
+                self._report_requested = False
+                next_report = time.monotonic() + self.report_interval
+                print(self.memory_report(), file=sys.stderr)
+
+        print("Остановка воркеров...", file=sys.stderr)
+        for pid in list(self.children):
+            self._signal(pid, signal.SIGTERM)
+        for pid in list(self.children):
+            self._wait_exit(pid, self.drain_timeout + 5)
+
+
+def open_listener(host: str, port: int, backlog: int = 1024) -> socket.socket:
+    """Слушающий сокет, общий для всех воркеров: ядро само распределяет соединения"""
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.setblocking(False)
+    return sock
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="HTTP/JSON сервис перевода в режиме pre-fork")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("-w", "--workers", type=int, default=0, help="Число воркеров (по умолчанию — число ядер)")
+    parser.add_argument("--torch-threads", type=int, default=1, help="Потоков torch на воркер")
+    parser.add_argument("--max-batch", type=int, default=32, help="Предложений в одном микропакете")
+    parser.add_argument("--max-delay-ms", type=float, default=5.0, help="Сколько ждать наполнения микропакета")
+    parser.add_argument("--drain-timeout", type=float, default=10.0,
+                        help="Сколько секунд воркер дописывает начатые переводы при остановке")
+    parser.add_argument("--report-interval", type=float, default=0.0,
+                        help="Печатать память воркеров каждые N секунд (0 — только по SIGUSR1)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="Путь к дисковому кэшу переводов слов")
+    parser.add_argument("--lexicon", default=None, help="Офлайн-словарь (см. lexicon.py build)")
+    parser.add_argument("--offline", action="store_true", help="Не обращаться к сетевому переводчику")
+    parser.add_argument("--backend", default="google", help="'google' или URL HTTP-сервиса перевода слов")
+    parser.add_argument("--analysis", choices=ANALYSIS_MODES, default="stanza",
+                        help="Синтаксический анализ: всегда Stanza, adaptive — Stanza только для сложных предложений, "
+                             "morph — только морфология")
+    parser.add_argument("--watch-rules", type=float, default=0.0, metavar="SECONDS",
+                        help="Проверять файл правил каждые N секунд и применять изменения (0 — не следить)")
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, 'fork'):
+        parser.error("режим pre-fork требует os.fork — используйте server.py")
+
+    sock = open_listener(args.host, args.port)
+    # Потоки torch ограничиваются до загрузки Stanza, чтобы воркеры не конкурировали за ядра
+    set_torch_threads(args.torch_threads)
+    translator = AdvancedTransformationalTranslator(cache_path=args.cache, lexicon_path=args.lexicon,
+                                                    offline=args.offline, backend=args.backend,
+                                                    analysis=args.analysis)
+    print(f"Сервис перевода слушает {sock.getsockname()}", file=sys.stderr)
+    PreforkServer(translator, sock, args.workers or os.cpu_count() or 1, cache_path=args.cache,
+                  torch_threads=args.torch_threads, max_batch=args.max_batch,
+                  max_delay=args.max_delay_ms / 1000, drain_timeout=args.drain_timeout,
+                  report_interval=args.report_interval,
+                  rules_watcher=RulesWatcher(translator, args.watch_rules) if args.watch_rules else None).run()
+
+
+if __name__ == "__main__":
+    main()
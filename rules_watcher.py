@@ -0,0 +1,62 @@
+import os
+import threading
+from typing import Callable, Optional, Tuple
+
+
+class RulesWatcher:
+    """Следит за файлом правил переводчика и перезагружает их при изменении
+
+    Файл опрашивается раз в interval секунд (os.stat, без сторонних
+    библиотек). Правила перечитываются, только когда mtime и размер
+    совпали в двух опросах подряд: так не читается файл, который редактор
+    ещё дописывает. on_reload вызывается в потоке наблюдателя после
+    успешной замены правил.
+    """
+
+    def __init__(self, translator, interval: float = 2.0, on_reload: Optional[Callable[[], None]] = None):
+        self.translator = translator
+        self.interval = interval
+        self.on_reload = on_reload
+        self._loaded = self._signature()
+        self._seen = self._loaded
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.translator.rules_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def check(self) -> bool:
+        """Один опрос; True, если правила были заменены"""
+        signature = self._signature()
+        stable = signature == self._seen
+        self._seen = signature
+        if signature is None or signature == self._loaded or not stable:
+            return False
+        # Повторно неудачный файл не перечитывается, пока он не изменится снова
+        self._loaded = signature
+        if not self.translator.reload_rules():
+            return False
+        if self.on_reload is not None:
+            self.on_reload()
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Ошибка наблюдения за правилами: {e}")
+
+    def start(self) -> "RulesWatcher":
+        self._thread = threading.Thread(target=self._run, name="rules-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,60 @@
+import hashlib
+import json
+from typing import Dict, List, Optional
+
+from surface_realizer import TemplateRealizer, compile_realizers
+from trigger_matcher import TriggerMatcher
+
+
+class CompiledRuleset:
+    """Скомпилированное представление transformational_grammar_rules.json
+
+    Триггеры расширенных шаблонов собраны в один TriggerMatcher, лексические
+    исправления сведены в один словарь, а шаблоны скомпилированы в
+    реализаторы с проверкой полей. Исходный словарь правил хранится в rules.
+    """
+
+    def __init__(self, rules: Dict, version: str):
+        self.rules = rules
+        self.version = version
+
+        system = rules.get("english_grammar_system", {}) if isinstance(rules, dict) else {}
+        sentence_patterns = system.get("sentence_patterns", {})
+        self.patterns: Dict = sentence_patterns.get("basic_clause_patterns", {})
+        self.extended_patterns: Dict = sentence_patterns.get("extended_patterns", {})
+        self.lexical_corrections: Dict = system.get("lexical_corrections", {})
+        self.preposition_rules: Dict = system.get("preposition_rules", {})
+
+        # Первая категория, содержащая слово, имеет приоритет — как при обходе по категориям
+        self.lexicon: Dict[str, str] = {}
+        for category in self.lexical_corrections.values():
+            for word, translation in category.items():
+                self.lexicon.setdefault(word, translation)
+
+        self.trigger_matcher = TriggerMatcher(self.extended_patterns)
+        self.basic_realizers: Dict[Optional[str], TemplateRealizer]
+        self.extended_realizers: Dict[str, TemplateRealizer]
+        self.template_errors: List[str]
+        self.basic_realizers, self.extended_realizers, self.template_errors = compile_realizers(
+            self.patterns, self.extended_patterns)
+
+    @property
+    def is_valid(self) -> bool:
+        return isinstance(self.rules, dict) and "english_grammar_system" in self.rules
+
+
+def file_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def load_ruleset(path: str) -> CompiledRuleset:
+    """Читает JSON с правилами и компилирует его
+
+    Скомпилированные правила на диск не сохраняются: компиляция занимает
+    доли миллисекунды, а загрузка объектов из файла рядом с правилами
+    (pickle) позволила бы выполнить чужой код любому, кто может писать в
+    этот каталог.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    return CompiledRuleset(json.loads(data.decode('utf-8')), file_digest(data))
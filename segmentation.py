@@ -0,0 +1,81 @@
+import re
+from typing import IO, Iterable, Iterator
+
+
+# Конец предложения: знаки препинания, закрывающие кавычки и пробел — или пустая строка
+_BOUNDARY = re.compile(r'([.!?…]+)(["»”)]*)(\s+)|\n[ \t]*\n\s*')
+_LAST_WORD = re.compile(r'(\w+)$')
+
+# Сокращения, после точки в которых предложение не заканчивается
+ABBREVIATIONS = frozenset({
+    'т', 'е', 'д', 'п', 'др', 'пр', 'см', 'ср', 'стр', 'рис', 'табл', 'гл',
+    'г', 'гг', 'в', 'вв', 'им', 'ул', 'пл', 'пер', 'тыс', 'млн', 'млрд', 'руб', 'коп',
+    'проф', 'акад', 'доц', 'англ', 'рус', 'лат',
+})
+
+# Предложение без границы длиннее этого режется по последнему пробелу
+MAX_SENTENCE_CHARS = 1000
+
+
+def read_chunks(file: IO[str], size: int = 65536) -> Iterator[str]:
+    """Читает файл кусками фиксированного размера"""
+    while True:
+        chunk = file.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _is_sentence_end(text: str, match) -> bool:
+    if match.group(1) == '.':
+        word = _LAST_WORD.search(text, max(0, match.start() - 20), match.start())
+        if word and (word.group(1).lower() in ABBREVIATIONS or
+                     (len(word.group(1)) == 1 and word.group(1).isupper())):
+            return False
+    # Продолжение со строчной буквы или тире прямой речи — то же предложение
+    following = text[match.end():match.end() + 1]
+    return not (following.islower() or following in ('—', '–'))
+
+
+def _clean(sentence: str) -> str:
+    return ' '.join(sentence.split())
+
+
+def iter_sentences(chunks: Iterable[str], max_chars: int = MAX_SENTENCE_CHARS) -> Iterator[str]:
+    """Делит поток текста на предложения по мере чтения
+
+    chunks — любые куски текста (строки файла, блоки read_chunks, одна
+    строка целиком). В буфере держится только незаконченное предложение,
+    поэтому память не зависит от размера текста. Переводы строк внутри
+    предложения заменяются пробелами, пустая строка считается границей.
+    """
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        start = 0
+        for match in _BOUNDARY.finditer(buffer):
+            if match.group(1) is not None:
+                # Следующий символ ещё не прочитан — решим со следующим куском
+                if match.end() == len(buffer):
+                    break
+                if not _is_sentence_end(buffer, match):
+                    continue
+                sentence = _clean(buffer[start:match.start(3)])
+            else:
+                sentence = _clean(buffer[start:match.start()])
+            if sentence:
+                yield sentence
+            start = match.end()
+        buffer = buffer[start:]
+
+        while len(buffer) > max_chars:
+            cut = buffer.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            sentence = _clean(buffer[:cut])
+            if sentence:
+                yield sentence
+            buffer = buffer[cut:]
+
+    sentence = _clean(buffer)
+    if sentence:
+        yield sentence
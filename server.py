@@ -0,0 +1,325 @@
+import argparse
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional
+
+from analysis_router import ANALYSIS_MODES
+from main import AdvancedTransformationalTranslator
+from rules_watcher import RulesWatcher
+
+
+MAX_BODY_SIZE = 10 * 1024 * 1024
+
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class TranslationService:
+    """Асинхронная обёртка над прогретым переводчиком
+
+    Одинаковые предложения, уже ожидающие перевода, объединяются в один
+    запрос; ожидающие предложения собираются в микропакеты и передаются
+    в translate_batch, чтобы Stanza обрабатывала их одним вызовом.
+    Переводчик не потокобезопасен, поэтому работает в единственном потоке.
+    """
+
+    def __init__(self, translator: AdvancedTransformationalTranslator,
+                 max_batch: int = 32, max_delay: float = 0.005):
+        self.translator = translator
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="translator")
+        self._queue: Optional[asyncio.Queue] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._batcher_task: Optional[asyncio.Task] = None
+        self.stats = {"requests": 0, "coalesced": 0, "batches": 0, "batched_sentences": 0}
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._batcher_task = asyncio.get_running_loop().create_task(self._batch_loop())
+
+    async def stop(self):
+        if self._batcher_task is not None:
+            self._batcher_task.cancel()
+            try:
+                await self._batcher_task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=True)
+
+    async def drain(self, timeout: float):
+        """Ждёт завершения начатых переводов, но не дольше timeout секунд"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self._inflight and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+
+    async def translate(self, sentence: str) -> Dict:
+        self.stats["requests"] += 1
+        future = self._inflight.get(sentence)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[sentence] = future
+            self._queue.put_nowait(sentence)
+        else:
+            self.stats["coalesced"] += 1
+        # shield: отмена одного клиента не должна отменять общий результат
+        return await asyncio.shield(future)
+
+    async def translate_many(self, sentences: List[str]) -> List[Dict]:
+        return await asyncio.gather(*(self.translate(s) for s in sentences))
+
+    async def stream_many(self, sentences: List[str]) -> AsyncIterator[Dict]:
+        """Выдаёт результаты в порядке входа по мере готовности"""
+        tasks = [asyncio.ensure_future(self.translate(s)) for s in sentences]
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self.stats["batches"] += 1
+            self.stats["batched_sentences"] += len(batch)
+            try:
+                results = await loop.run_in_executor(self._executor, self.translator.translate_batch, batch)
+            except Exception as e:
+                for sentence in batch:
+                    future = self._inflight.pop(sentence, None)
+                    if future is not None and not future.done():
+                        future.set_exception(e)
+                continue
+            for sentence, result in zip(batch, results):
+                future = self._inflight.pop(sentence, None)
+                if future is not None and not future.done():
+                    future.set_result(result)
+
+
+class TranslationHTTPServer:
+    """Минимальный HTTP/1.1 сервер с JSON API поверх TranslationService
+
+    POST /translate        {"text": "..."}
+    POST /translate/batch  {"sentences": [...], "stream": false}
+    GET  /health
+    При "stream": true результаты отдаются построчно (NDJSON, chunked).
+    """
+
+    def __init__(self, service: TranslationService):
+        self.service = service
+        # После остановки ответы отдаются с Connection: close
+        self.stopping = False
+        # Соединения, ожидающие следующего запроса
+        self._idle = set()
+
+    def close_connections(self):
+        """Закрывает простаивающие keep-alive соединения; занятые закроются после ответа"""
+        for writer in list(self._idle):
+            writer.close()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                self._idle.add(writer)
+                request_line = await reader.readline()
+                self._idle.discard(writer)
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._send_json(writer, 400, {"error": "Malformed request line"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = (version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                              and not self.stopping)
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0 or length > MAX_BODY_SIZE:
+                    await self._send_json(writer, 413 if length > 0 else 400,
+                                          {"error": "Invalid Content-Length"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                await self.dispatch(method, path.split('?', 1)[0], body, writer, keep_alive)
+                if not keep_alive or writer.is_closing():
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._idle.discard(writer)
+            writer.close()
+
+    async def dispatch(self, method: str, path: str, body: bytes,
+                       writer: asyncio.StreamWriter, keep_alive: bool):
+        if path == '/health':
+            if method != 'GET':
+                return await self._send_json(writer, 405, {"error": "Use GET"}, keep_alive)
+            return await self._send_json(writer, 200, {"status": "ok", **self.service.stats,
+                                                       "analysis": self.service.translator.analysis_router.stats(),
+                                                       "rules_version": self.service.translator.ruleset.version},
+                                         keep_alive)
+
+        if path not in ('/translate', '/translate/batch'):
+            return await self._send_json(writer, 404, {"error": f"Unknown path {path}"}, keep_alive)
+        if method != 'POST':
+            return await self._send_json(writer, 405, {"error": "Use POST"}, keep_alive)
+
+        try:
+            payload = json.loads(body.decode('utf-8') or '{}')
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            return await self._send_json(writer, 400, {"error": f"Invalid JSON: {e}"}, keep_alive)
+        if not isinstance(payload, dict):
+            return await self._send_json(writer, 400, {"error": "JSON object expected"}, keep_alive)
+
+        try:
+            if path == '/translate':
+                text = payload.get("text")
+                if not isinstance(text, str) or not text.strip():
+                    return await self._send_json(writer, 400, {"error": "Field 'text' is required"}, keep_alive)
+                result = await self.service.translate(text)
+                return await self._send_json(writer, 200, result, keep_alive)
+
+            sentences = payload.get("sentences")
+            if not isinstance(sentences, list) or not all(isinstance(s, str) for s in sentences):
+                return await self._send_json(writer, 400, {"error": "Field 'sentences' must be a list of strings"},
+                                             keep_alive)
+            if payload.get("stream"):
+                return await self._send_stream(writer, self.service.stream_many(sentences), keep_alive)
+            results = await self.service.translate_many(sentences)
+            return await self._send_json(writer, 200, {"results": results}, keep_alive)
+        except Exception as e:
+            return await self._send_json(writer, 500, {"error": str(e)}, keep_alive)
+
+    @staticmethod
+    def _head(status: int, content_type: str, keep_alive: bool, extra: str) -> bytes:
+        return (f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                f"{extra}\r\n").encode('latin-1')
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload, keep_alive: bool):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        writer.write(self._head(status, "application/json; charset=utf-8", keep_alive,
+                                f"Content-Length: {len(data)}\r\n") + data)
+        await writer.drain()
+
+    async def _send_stream(self, writer: asyncio.StreamWriter, results: AsyncIterator[Dict], keep_alive: bool):
+        writer.write(self._head(200, "application/x-ndjson; charset=utf-8", keep_alive,
+                                "Transfer-Encoding: chunked\r\n"))
+        try:
+            async for result in results:
+                self._write_chunk(writer, result)
+                await writer.drain()
+        except ConnectionError:
+            raise
+        except Exception as e:
+            # Заголовки 200 уже отправлены: ошибка сообщается последней строкой потока,
+            # а завершающий блок не отправляется — соединение закрывается, и клиент
+            # получает оборванное тело, которое не примет за полный ответ
+            self._write_chunk(writer, {"error": str(e)})
+            await writer.drain()
+            writer.close()
+            return
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    @staticmethod
+    def _write_chunk(writer: asyncio.StreamWriter, payload):
+        line = json.dumps(payload, ensure_ascii=False).encode('utf-8') + b"\n"
+        writer.write(f"{len(line):x}\r\n".encode('latin-1') + line + b"\r\n")
+
+
+async def serve(translator: AdvancedTransformationalTranslator, host: str = "127.0.0.1", port: int = 8080,
+                sock=None, max_batch: int = 32, max_delay: float = 0.005,
+                stop: Optional[asyncio.Event] = None, drain_timeout: float = 10.0):
+    """Запускает сервис; sock — уже открытый слушающий сокет (для режима pre-fork)
+
+    Если передано событие stop, после него сервис перестаёт принимать
+    соединения, до drain_timeout секунд дописывает начатые переводы и
+    завершается.
+    """
+    service = TranslationService(translator, max_batch=max_batch, max_delay=max_delay)
+    service.start()
+    http = TranslationHTTPServer(service)
+    if sock is not None:
+        server = await asyncio.start_server(http.handle_connection, sock=sock)
+    else:
+        server = await asyncio.start_server(http.handle_connection, host, port)
+    addresses = ", ".join(str(s.getsockname()) for s in server.sockets)
+    print(f"Сервис перевода слушает {addresses}", file=sys.stderr)
+    try:
+        async with server:
+            if stop is None:
+                await server.serve_forever()
+            else:
+                await stop.wait()
+                http.stopping = True
+                server.close()
+                await service.drain(drain_timeout)
+                http.close_connections()
+    finally:
+        await service.stop()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="HTTP/JSON сервис трансформационного перевода")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-batch", type=int, default=32, help="Предложений в одном микропакете")
+    parser.add_argument("--max-delay-ms", type=float, default=5.0, help="Сколько ждать наполнения микропакета")
+    parser.add_argument("--lexicon", default=None, help="Офлайн-словарь (см. lexicon.py build)")
+    parser.add_argument("--offline", action="store_true", help="Не обращаться к сетевому переводчику")
+    parser.add_argument("--backend", default="google", help="'google' или URL HTTP-сервиса перевода слов")
+    parser.add_argument("--analysis", choices=ANALYSIS_MODES, default="stanza",
+                        help="Синтаксический анализ: всегда Stanza, adaptive — Stanza только для сложных предложений, "
+                             "morph — только морфология")
+    parser.add_argument("--watch-rules", type=float, default=0.0, metavar="SECONDS",
+                        help="Проверять файл правил каждые N секунд и применять изменения (0 — не следить)")
+    args = parser.parse_args(argv)
+
+    # Модели загружаются один раз и обслуживают всех клиентов
+    translator = AdvancedTransformationalTranslator(lexicon_path=args.lexicon, offline=args.offline,
+                                                    backend=args.backend, analysis=args.analysis)
+    if args.watch_rules:
+        RulesWatcher(translator, args.watch_rules).start()
+    try:
+        asyncio.run(serve(translator, args.host, args.port,
+                          max_batch=args.max_batch, max_delay=args.max_delay_ms / 1000))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
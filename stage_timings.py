@@ -0,0 +1,57 @@
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict
+
+
+class StageTimings:
+    """Время и число вызовов этапов одного перевода, а также счётчики кэшей
+
+    Этапы могут быть вложенными (например, stanza внутри analysis), поэтому
+    их время не складывается в общее.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, list] = {}
+        self.counters: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.stages.get(name)
+            if entry is None:
+                entry = self.stages[name] = [0.0, 0]
+            entry[0] += time.perf_counter() - started
+            entry[1] += 1
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def as_dict(self) -> Dict:
+        return {
+            "total_ms": (time.perf_counter() - self.started) * 1000,
+            "stages": {name: {"ms": seconds * 1000, "calls": calls}
+                       for name, (seconds, calls) in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+
+class _DisabledTimings:
+    """Заглушка при выключенных замерах: ничего не записывает"""
+
+    enabled = False
+    _NULL_STAGE = nullcontext()
+
+    def stage(self, name: str):
+        return self._NULL_STAGE
+
+    def count(self, name: str, amount: int = 1):
+        pass
+
+
+DISABLED_TIMINGS = _DisabledTimings()
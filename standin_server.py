@@ -0,0 +1,119 @@
+import argparse
+import hashlib
+import json
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+
+# Транслитерация для детерминированных «переводов» слов, которых нет в словаре
+_TRANSLIT = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'ж': 'zh',
+    'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o',
+    'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'shch', 'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu',
+    'я': 'ya',
+})
+
+
+class StandinTranslator:
+    """Детерминированный заменитель сервиса перевода для нагрузочных тестов
+
+    Слова ищутся в офлайн-словаре (если он задан), остальные
+    транслитерируются. Задержка и доля ошибок настраиваются; решение об
+    ошибке зависит только от текста запроса, поэтому прогоны повторяемы.
+    """
+
+    def __init__(self, lexicon=None, latency: float = 0.0, error_rate: float = 0.0):
+        self.lexicon = lexicon
+        self.latency = latency
+        self.error_rate = error_rate
+
+    def translate(self, word: str) -> str:
+        if self.lexicon is not None:
+            translation = self.lexicon.get(word)
+            if translation is not None:
+                return translation
+        return word.lower().translate(_TRANSLIT)
+
+    def should_fail(self, words: List[str]) -> bool:
+        if self.error_rate <= 0:
+            return False
+        digest = hashlib.sha256('\n'.join(words).encode('utf-8')).digest()
+        return int.from_bytes(digest[:4], 'big') / 2 ** 32 < self.error_rate
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status: int, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        if self.path.rstrip('/').split('/')[-1] != 'translate':
+            return self._send_json(404, {"error": "not found"})
+        try:
+            words = json.loads(body.decode('utf-8'))["q"]
+            if not isinstance(words, list):
+                raise ValueError("q must be a list")
+        except (UnicodeDecodeError, ValueError, KeyError, TypeError) as e:
+            return self._send_json(400, {"error": str(e)})
+
+        translator: StandinTranslator = self.server.translator
+        if translator.latency:
+            time.sleep(translator.latency)
+        if translator.should_fail(words):
+            return self._send_json(503, {"error": "simulated failure"})
+        self._send_json(200, {"translations": [translator.translate(str(w)) for w in words]})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8099, translator: Optional[StandinTranslator] = None):
+    server = ThreadingHTTPServer((host, port), StandinHandler)
+    server.daemon_threads = True
+    server.translator = translator or StandinTranslator()
+    return server
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Локальный заменитель сервиса перевода слов")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--lexicon", default=None, help="Офлайн-словарь для ответов (см. lexicon.py build)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Искусственная задержка ответа")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Доля запросов, завершающихся 503")
+    args = parser.parse_args(argv)
+
+    lexicon = None
+    if args.lexicon:
+        from lexicon import MmapLexicon
+        lexicon = MmapLexicon(args.lexicon)
+    server = make_server(args.host, args.port,
+                         StandinTranslator(lexicon, args.latency_ms / 1000, args.error_rate))
+    print(f"Заменитель сервиса перевода: http://{args.host}:{server.server_port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
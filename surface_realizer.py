@@ -0,0 +1,114 @@
+import re
+import string
+from typing import Dict, List, Mapping, Tuple
+
+
+# Слоты, которые заполняет генерация повествовательного предложения по базовым шаблонам
+BASIC_SLOTS = frozenset({"subject", "verb", "article", "object", "indirect_object", "adverbial", "complement"})
+
+# Расширенные шаблоны, для которых есть генерация, и их слоты
+EXTENDED_SLOTS = {
+    "POSSESSION": frozenset({"subject", "verb", "article", "object", "location"}),
+    "PHRASAL_VERB": frozenset({"subject", "verb_phrase", "object", "location"}),
+}
+
+# Встроенные базовые шаблоны — на случай, если JSON не загружен или шаблон в нём неверен
+DEFAULT_BASIC_TEMPLATES = {
+    "SVO": "{subject} {verb} {article}{object}",
+    "SVOA": "{subject} {verb} {article}{object} {adverbial}",
+    "SVOO": "{subject} {verb} {indirect_object} {article}{object}",
+}
+FALLBACK_TEMPLATE = "{subject} {verb}"
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class TemplateError(ValueError):
+    pass
+
+
+class TemplateRealizer:
+    """Шаблон, заранее разобранный на слова из литералов и слотов
+
+    Слово шаблона — всё, что между пробелами, например "{article}{object}".
+    Слова, которые после подстановки оказались пустыми, пропускаются, поэтому
+    незаполненный слот не оставляет двойных пробелов. Артикль передаётся
+    вместе с пробелом после него ("a ").
+    """
+
+    __slots__ = ('template', 'slots', '_words')
+
+    def __init__(self, template: str):
+        self.template = template
+        slots = []
+        words: List[List[Tuple[bool, str]]] = [[]]
+        try:
+            parsed = list(string.Formatter().parse(template))
+        except ValueError as e:
+            raise TemplateError(f"некорректный шаблон «{template}»: {e}")
+        for literal, field, spec, conversion in parsed:
+            pieces = _WHITESPACE.split(literal)
+            for index, piece in enumerate(pieces):
+                if index:
+                    words.append([])
+                if piece:
+                    words[-1].append((False, piece))
+            if field is None:
+                continue
+            if not field.isidentifier():
+                raise TemplateError(f"поле «{field}» в шаблоне «{template}» должно быть именем")
+            if spec or conversion:
+                raise TemplateError(f"форматирование поля «{field}» в шаблоне «{template}» не поддерживается")
+            words[-1].append((True, field))
+            if field not in slots:
+                slots.append(field)
+        self.slots: Tuple[str, ...] = tuple(slots)
+        self._words = tuple(tuple(word) for word in words if word)
+
+    def __call__(self, components: Mapping[str, str]) -> str:
+        rendered = []
+        for word in self._words:
+            text = "".join([components[value] if is_slot else value for is_slot, value in word])
+            if text:
+                rendered.append(text)
+        return " ".join(rendered)
+
+
+def _compile(name: str, template: str, allowed: frozenset, errors: List[str]):
+    try:
+        realizer = TemplateRealizer(template)
+    except TemplateError as e:
+        errors.append(f"{name}: {e}")
+        return None
+    unknown = [slot for slot in realizer.slots if slot not in allowed]
+    if unknown:
+        errors.append(f"{name}: неизвестные поля {', '.join(unknown)} в шаблоне «{template}»")
+        return None
+    return realizer
+
+
+def compile_realizers(patterns: Dict, extended_patterns: Dict):
+    """Компилирует шаблоны правил и проверяет их поля
+
+    Возвращает базовые реализаторы (по имени, включая встроенные и запасной
+    под ключом None), расширенные реализаторы и список ошибок. Неверный
+    базовый шаблон заменяется встроенным, неверный расширенный — отключается.
+    """
+    errors: List[str] = []
+    basic: Dict = {name: TemplateRealizer(template) for name, template in DEFAULT_BASIC_TEMPLATES.items()}
+    basic[None] = TemplateRealizer(FALLBACK_TEMPLATE)
+    for name, config in patterns.items():
+        if isinstance(config, dict) and config.get("template"):
+            realizer = _compile(name, config["template"], BASIC_SLOTS, errors)
+            if realizer is not None:
+                basic[name] = realizer
+
+    extended: Dict[str, TemplateRealizer] = {}
+    for name, config in extended_patterns.items():
+        # Шаблоны без генерации повествовательного предложения (например, вопросы о цене) не компилируются
+        if name not in EXTENDED_SLOTS or not isinstance(config, dict) or not config.get("template"):
+            continue
+        realizer = _compile(name, config["template"], EXTENDED_SLOTS[name], errors)
+        if realizer is not None:
+            extended[name] = realizer
+    return basic, extended, errors
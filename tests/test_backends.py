@@ -0,0 +1,135 @@
+import time
+
+import pytest
+
+from backends import BackendError, BackendUnavailable, CircuitBreaker, ResilientBackend, TokenBucket, \
+    TranslationBackend
+
+
+class ScriptedBackend(TranslationBackend):
+    """Бэкенд, который по очереди выдаёт заданные исходы: исключение или успех"""
+
+    name = 'scripted'
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def translate_batch(self, words, timeout=None):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else None
+        if isinstance(outcome, Exception):
+            raise outcome
+        return [word.upper() for word in words]
+
+
+def resilient(inner, **options):
+    options.setdefault("backoff_base", 0.001)
+    options.setdefault("breaker", CircuitBreaker(failure_threshold=2, reset_timeout=0.0))
+    return ResilientBackend(inner, **options)
+
+
+def test_breaker_opens_after_threshold_and_closes_after_trial():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    # После паузы пропускается ровно один пробный запрос
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_transient_errors_are_retried():
+    inner = ScriptedBackend(BackendError("HTTP 503"), None)
+    backend = resilient(inner, breaker=CircuitBreaker(failure_threshold=5))
+    assert backend.translate_batch(["кот"]) == ["КОТ"]
+    assert inner.calls == 2
+    assert backend.stats["retries"] == 1
+    assert backend.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_transient_errors_open_breaker():
+    inner = ScriptedBackend(*[BackendError("timeout")] * 10)
+    backend = resilient(inner, max_retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    for _ in range(2):
+        with pytest.raises(BackendError):
+            backend.translate_batch(["кот"])
+    with pytest.raises(BackendUnavailable):
+        backend.translate_batch(["кот"])
+    assert inner.calls == 2
+
+
+def test_non_retryable_error_is_raised_without_tripping_breaker():
+    inner = ScriptedBackend(*[BackendError("HTTP 404", retryable=False)] * 5)
+    backend = resilient(inner)
+    for _ in range(5):
+        with pytest.raises(BackendError, match="HTTP 404"):
+            backend.translate_batch(["кот"])
+    assert inner.calls == 5
+    assert backend.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_non_retryable_error_releases_half_open_trial():
+    inner = ScriptedBackend(BackendError("timeout"), BackendError("HTTP 400", retryable=False), None)
+    backend = resilient(inner, max_retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.0))
+    with pytest.raises(BackendError):
+        backend.translate_batch(["кот"])
+    with pytest.raises(BackendError, match="HTTP 400"):
+        backend.translate_batch(["кот"])
+    assert backend.translate_batch(["кот"]) == ["КОТ"]
+
+
+def test_expired_deadline_does_not_lock_half_open_breaker():
+    inner = ScriptedBackend(BackendError("timeout"), None)
+    backend = resilient(inner, max_retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.0))
+    with pytest.raises(BackendError):
+        backend.translate_batch(["кот"])
+    with pytest.raises(BackendUnavailable):
+        backend.translate_batch(["кот"], timeout=0.0)
+    assert backend.translate_batch(["кот"]) == ["КОТ"]
+
+
+def test_rate_limited_call_does_not_lock_half_open_breaker():
+    inner = ScriptedBackend(BackendError("timeout"), None)
+    backend = resilient(inner, max_retries=0, rate=1.0,
+                        breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.0))
+    with pytest.raises(BackendError):
+        backend.translate_batch(["кот"])
+    # Токен израсходован, а следующий не успеет появиться до срока
+    with pytest.raises(BackendUnavailable):
+        backend.translate_batch(["кот"], timeout=0.05)
+    time.sleep(1.0)
+    assert backend.translate_batch(["кот"]) == ["КОТ"]
+
+
+def test_unexpected_error_releases_half_open_trial():
+    inner = ScriptedBackend(BackendError("timeout"), TypeError("ошибка"), None)
+    backend = resilient(inner, max_retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.0))
+    with pytest.raises(BackendError):
+        backend.translate_batch(["кот"])
+    with pytest.raises(TypeError):
+        backend.translate_batch(["кот"])
+    assert backend.translate_batch(["кот"]) == ["КОТ"]
+
+
+def test_token_bucket_gives_up_after_deadline():
+    bucket = TokenBucket(rate=1.0, capacity=1)
+    assert bucket.acquire()
+    assert not bucket.acquire(deadline=time.monotonic() + 0.05)
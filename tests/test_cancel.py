@@ -0,0 +1,39 @@
+import threading
+
+import pytest
+
+from backends import TranslationBackend
+from main import AdvancedTransformationalTranslator, TranslationCancelled
+
+
+class CancellingBackend(TranslationBackend):
+    """Бэкенд, который, как новый запрос в GUI, отменяет текущий перевод"""
+
+    name = 'cancelling'
+
+    def __init__(self):
+        self.cancel = threading.Event()
+        self.calls = 0
+
+    def translate_batch(self, words, timeout=None):
+        self.calls += 1
+        self.cancel.set()
+        return [f"en_{word}" for word in words]
+
+
+def test_cancel_stops_translation_between_stages():
+    backend = CancellingBackend()
+    translator = AdvancedTransformationalTranslator(cache_path=None, load_models=False, backend=backend)
+    with pytest.raises(TranslationCancelled):
+        translator.translate_with_analysis("Студент читает книгу", cancel=backend.cancel)
+    assert backend.calls == 1
+    # Прерванный перевод не попадает в память переводов
+    assert len(translator.translation_memory) == 0
+
+
+def test_translation_without_cancel_completes():
+    backend = CancellingBackend()
+    translator = AdvancedTransformationalTranslator(cache_path=None, load_models=False, backend=backend)
+    result = translator.translate_with_analysis("Студент читает книгу")
+    assert result["translation"]
+    assert len(translator.translation_memory) == 1
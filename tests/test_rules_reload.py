@@ -0,0 +1,69 @@
+import json
+import os
+
+import pytest
+
+from main import RULES_FILE, AdvancedTransformationalTranslator
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def translator(monkeypatch):
+    # Правила ищутся относительно рабочего каталога
+    monkeypatch.chdir(REPO)
+    return AdvancedTransformationalTranslator(cache_path=None, load_models=False, offline=True)
+
+
+@pytest.fixture
+def rules():
+    with open(os.path.join(REPO, RULES_FILE), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_rules(path, rules):
+    path.write_text(json.dumps(rules, ensure_ascii=False), encoding='utf-8')
+    return str(path)
+
+
+def test_reload_applies_new_lexicon_and_evicts_only_changed_words(translator, rules, tmp_path):
+    old_version = translator.ruleset.version
+    translator.translate_words(["чай", "кофе", "дом"])
+    assert translator.translation_cache["чай"] == "tea"
+
+    rules["english_grammar_system"]["lexical_corrections"]["common_nouns"]["чай"] = "green tea"
+    assert translator.reload_rules(write_rules(tmp_path / "rules.json", rules))
+    assert translator.ruleset.version != old_version
+
+    # Устаревшие слова убираются при закреплении правил следующим запросом
+    translator.translate_with_analysis("Она пьёт чай.")
+    assert translator.translation_cache.get("чай") != "tea"
+    assert translator.translation_cache["кофе"] == "coffee"
+    assert translator.translate_words(["чай"]) == {"чай": "green tea"}
+
+
+def test_reload_of_same_rules_is_a_no_op(translator, rules, tmp_path):
+    path = write_rules(tmp_path / "rules.json", rules)
+    assert translator.reload_rules(path)
+    assert not translator.reload_rules(path)
+
+
+def test_broken_rules_keep_current_ruleset(translator, tmp_path):
+    current = translator.ruleset
+    broken = tmp_path / "rules.json"
+    broken.write_text("{ не json", encoding='utf-8')
+    assert not translator.reload_rules(str(broken))
+    missing_section = tmp_path / "other.json"
+    missing_section.write_text("{}", encoding='utf-8')
+    assert not translator.reload_rules(str(missing_section))
+    assert translator.ruleset is current
+
+
+def test_request_keeps_rules_it_started_with(translator, rules, tmp_path):
+    rules["english_grammar_system"]["lexical_corrections"]["common_nouns"]["чай"] = "green tea"
+    with translator._pinned_rules():
+        pinned = translator.ruleset
+        assert translator.reload_rules(write_rules(tmp_path / "rules.json", rules))
+        assert translator.ruleset is pinned
+        assert translator.ruleset.lexicon["чай"] == "tea"
+    assert translator.ruleset.lexicon["чай"] == "green tea"
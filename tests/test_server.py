@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+from server import TranslationHTTPServer
+
+
+class StreamService:
+    """Сервис, который выдаёт результаты и падает на предложении "сбой" """
+
+    stats = {}
+
+    async def stream_many(self, sentences):
+        for sentence in sentences:
+            if sentence == "сбой":
+                raise RuntimeError("перевод не удался")
+            yield {"original": sentence}
+
+
+async def post_stream(sentences):
+    http = TranslationHTTPServer(StreamService())
+    server = await asyncio.start_server(http.handle_connection, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        body = json.dumps({"sentences": sentences, "stream": True}).encode()
+        writer.write(b"POST /translate/batch HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % len(body) + body)
+        await writer.drain()
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines, complete = [], False
+        while True:
+            size_line = await reader.readline()
+            if not size_line:
+                # Соединение закрыто посреди тела
+                break
+            size = int(size_line, 16)
+            if size == 0:
+                await reader.readexactly(2)
+                complete = True
+                break
+            lines.append(json.loads(await reader.readexactly(size)))
+            await reader.readexactly(2)
+        writer.close()
+        return head, lines, complete
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+def test_stream_ends_with_terminating_chunk():
+    head, lines, complete = asyncio.run(post_stream(["раз", "два"]))
+    assert head.startswith(b"HTTP/1.1 200")
+    assert b"Transfer-Encoding: chunked" in head
+    assert lines == [{"original": "раз"}, {"original": "два"}]
+    assert complete
+
+
+def test_failed_stream_is_truncated_after_error_line():
+    head, lines, complete = asyncio.run(post_stream(["раз", "сбой", "два"]))
+    assert head.startswith(b"HTTP/1.1 200")
+    assert lines == [{"original": "раз"}, {"error": "перевод не удался"}]
+    # Ни второго статуса внутри тела, ни завершающего блока
+    assert not complete
@@ -0,0 +1,65 @@
+import json
+import os
+import re
+
+import pytest
+
+from main import RULES_FILE
+from trigger_matcher import AhoCorasick, TriggerMatcher
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SENTENCES = [
+    "у меня есть дом в деревне.", "сколько стоит кофе?", "сколько стоят яблоки?", "они ждать тебя.",
+    "я смотрю на дом.", "мы идём в парк.", "у тебя есть кошка, а у меня есть собака.", "она пьёт чай.",
+    "", "?", "у", "есть",
+]
+
+
+def match_one_by_one(extended_patterns, text):
+    """Прежняя проверка: каждый шаблон по очереди, в порядке JSON"""
+    found = []
+    for name, config in extended_patterns.items():
+        regex = config.get("trigger_regex")
+        if (regex and re.search(regex, text)) or any(verb in text for verb in config.get("trigger_verbs", ())):
+            found.append(name)
+    return found
+
+
+def shipped_patterns():
+    with open(os.path.join(REPO, RULES_FILE), encoding='utf-8') as f:
+        rules = json.load(f)
+    return rules["english_grammar_system"]["sentence_patterns"]["extended_patterns"]
+
+
+OVERLAPPING = {
+    "OWNER": {"trigger_regex": r"у \w+ есть"},
+    "AT_ME": {"trigger_regex": r"у меня"},
+    "WAIT": {"trigger_verbs": ["ждать", "жду"]},
+    "BE": {"trigger_regex": r"\bесть\b"},
+    "LOOK": {"trigger_verbs": ["смотр"], "trigger_regex": r"на \w+"},
+}
+
+# Выражение с собственными флагами не объединяется и проверяется отдельно
+SEPARATE = {
+    "PRICE": {"trigger_regex": r"сколько\s+сто(ит|ят)"},
+    "CASELESS": {"trigger_regex": r"(?i)^У МЕНЯ"},
+}
+
+
+@pytest.mark.parametrize("patterns", [shipped_patterns(), OVERLAPPING, SEPARATE],
+                         ids=["shipped", "overlapping", "separate"])
+def test_matches_same_patterns_as_one_by_one_check(patterns):
+    matcher = TriggerMatcher(patterns)
+    for sentence in SENTENCES:
+        assert matcher.match(sentence) == match_one_by_one(patterns, sentence), sentence
+
+
+def test_lower_priority_regex_at_same_position_is_found():
+    assert TriggerMatcher(OVERLAPPING).match("у меня есть дом") == ["OWNER", "AT_ME", "BE"]
+
+
+def test_aho_corasick_finds_overlapping_keywords():
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    found = sorted((automaton.keywords[k], end) for k, end in automaton.find("ushers"))
+    assert found == [("he", 4), ("hers", 6), ("she", 4)]
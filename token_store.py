@@ -0,0 +1,199 @@
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# Поля токена в том же порядке и с теми же именами, что в прежних словарях
+TOKEN_FIELDS = ("id", "text", "lemma", "upos", "xpos", "feats", "head", "deprel")
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+class TokenTable(Mapping):
+    """Компактный разбор Stanza: токены хранятся параллельными колонками
+
+    Строки интернированы, поэтому повторяющиеся части речи, отношения и
+    словоформы занимают память один раз. Снаружи таблица выглядит как
+    прежний словарь {"sentences", "tokens", "dependencies"}, только для
+    чтения; представления токенов и зависимостей создаются при обращении.
+    """
+
+    __slots__ = ('ids', 'texts', 'lemmas', 'upos', 'xpos', 'feats', 'heads', 'deprels', 'sentence_spans',
+                 '_indexes')
+
+    def __init__(self):
+        self.ids = array('i')
+        self.heads = array('i')
+        self.texts: List[str] = []
+        self.lemmas: List[Optional[str]] = []
+        self.upos: List[Optional[str]] = []
+        self.xpos: List[Optional[str]] = []
+        self.feats: List[Optional[str]] = []
+        self.deprels: List[Optional[str]] = []
+        # (начало, конец, текст) каждого предложения в колонках
+        self.sentence_spans: List[Tuple[int, int, str]] = []
+        self._indexes: Optional[List["DependencyIndex"]] = None
+
+    @classmethod
+    def from_stanza_doc(cls, doc) -> "TokenTable":
+        return cls.from_stanza_sentences(doc.sentences)
+
+    @classmethod
+    def from_stanza_sentences(cls, sentences) -> "TokenTable":
+        """Таблица из части предложений документа Stanza"""
+        table = cls()
+        for sent in sentences:
+            start = len(table.texts)
+            for word in sent.words:
+                table.ids.append(word.id)
+                table.heads.append(word.head)
+                table.texts.append(_intern(word.text))
+                table.lemmas.append(_intern(word.lemma))
+                table.upos.append(_intern(word.upos))
+                table.xpos.append(_intern(word.xpos))
+                table.feats.append(_intern(word.feats))
+                table.deprels.append(_intern(word.deprel))
+            table.sentence_spans.append((start, len(table.texts), sent.text))
+        return table
+
+    def __len__(self) -> int:
+        return 3
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(("sentences", "tokens", "dependencies"))
+
+    def __getitem__(self, key: str):
+        if key == "sentences":
+            return [SentenceView(self, start, end, text) for start, end, text in self.sentence_spans]
+        if key == "tokens":
+            return TokenList(self, 0, len(self.texts))
+        if key == "dependencies":
+            return self.dependencies(0, len(self.texts))
+        raise KeyError(key)
+
+    def sentence_indexes(self) -> List["DependencyIndex"]:
+        """Индексы зависимостей по предложениям; строятся один раз"""
+        if self._indexes is None:
+            self._indexes = [DependencyIndex(self, start, end) for start, end, _ in self.sentence_spans]
+        return self._indexes
+
+    def dependencies(self, start: int, end: int) -> List[Dict]:
+        return [{"governor": self.heads[i], "dependent": self.ids[i], "relation": self.deprels[i]}
+                for i in range(start, end) if self.heads[i] > 0]
+
+
+class TokenView(Mapping):
+    """Токен таблицы как словарь только для чтения"""
+
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table: TokenTable, index: int):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, key: str):
+        table, i = self._table, self._index
+        if key == "text":
+            return table.texts[i]
+        if key == "deprel":
+            return table.deprels[i]
+        if key == "upos":
+            return table.upos[i]
+        if key == "id":
+            return table.ids[i]
+        if key == "head":
+            return table.heads[i]
+        if key == "lemma":
+            return table.lemmas[i]
+        if key == "xpos":
+            return table.xpos[i]
+        if key == "feats":
+            return table.feats[i]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(TOKEN_FIELDS)
+
+    def __len__(self) -> int:
+        return len(TOKEN_FIELDS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class TokenList(Sequence):
+    """Диапазон токенов таблицы как последовательность TokenView"""
+
+    __slots__ = ('_table', '_start', '_end')
+
+    def __init__(self, table: TokenTable, start: int, end: int):
+        self._table = table
+        self._start = start
+        self._end = end
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return TokenView(self._table, self._start + index)
+
+
+class SentenceView(Mapping):
+    """Предложение таблицы как словарь {"text", "words", "dependencies"}"""
+
+    __slots__ = ('_table', 'start', 'end', 'text')
+
+    def __init__(self, table: TokenTable, start: int, end: int, text: str):
+        self._table = table
+        self.start = start
+        self.end = end
+        self.text = text
+
+    def __getitem__(self, key: str):
+        if key == "text":
+            return self.text
+        if key == "words":
+            return TokenList(self._table, self.start, self.end)
+        if key == "dependencies":
+            return self._table.dependencies(self.start, self.end)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(("text", "words", "dependencies"))
+
+    def __len__(self) -> int:
+        return 3
+
+
+class DependencyIndex:
+    """Индекс одного предложения таблицы: отношение → токены, часть речи →
+    токены. Позиции токенов — индексы в колонках таблицы, списки
+    упорядочены по порядку слов."""
+
+    __slots__ = ('start', 'end', 'by_deprel', 'by_upos')
+
+    def __init__(self, table: TokenTable, start: int, end: int):
+        self.start = start
+        self.end = end
+        self.by_deprel: Dict[str, List[int]] = {}
+        self.by_upos: Dict[str, List[int]] = {}
+        for i in range(start, end):
+            self.by_deprel.setdefault(table.deprels[i], []).append(i)
+            self.by_upos.setdefault(table.upos[i], []).append(i)
+
+    def first(self, *deprels: str) -> Optional[int]:
+        positions = [self.by_deprel[d][0] for d in deprels if d in self.by_deprel]
+        return min(positions) if positions else None
+
+    def last(self, *deprels: str) -> Optional[int]:
+        positions = [self.by_deprel[d][-1] for d in deprels if d in self.by_deprel]
+        return max(positions) if positions else None
@@ -0,0 +1,165 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+
+DEFAULT_CACHE_PATH = 'translation_cache.sqlite3'
+
+
+class PersistentTranslationCache:
+    """Персистентный кэш переводов слов (SQLite в режиме WAL)
+
+    Ключ записи — (исходное слово, бэкенд перевода, целевой язык).
+    Поддерживает TTL, ограничение размера с вытеснением давно не
+    использованных записей и массовую загрузку при старте.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = 200000,
+                 ttl: Optional[float] = 30 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._touched: Dict[Tuple[str, str, str], float] = {}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS word_translations ("
+            " word TEXT NOT NULL,"
+            " backend TEXT NOT NULL,"
+            " target TEXT NOT NULL,"
+            " translation TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (word, backend, target)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_word_translations_accessed "
+            "ON word_translations (accessed_at)"
+        )
+        self._count = self._conn.execute("SELECT COUNT(*) FROM word_translations").fetchone()[0]
+
+    def _expiry_threshold(self) -> float:
+        if self.ttl is None:
+            return 0.0
+        return time.time() - self.ttl
+
+    def get(self, word: str, backend: str, target: str) -> Optional[str]:
+        """Возвращает сохранённый перевод или None, если записи нет или она устарела"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT translation, created_at FROM word_translations "
+                "WHERE word = ? AND backend = ? AND target = ?",
+                (word, backend, target)
+            ).fetchone()
+            if row is None:
+                return None
+            translation, created_at = row
+            if created_at < self._expiry_threshold():
+                self._conn.execute(
+                    "DELETE FROM word_translations WHERE word = ? AND backend = ? AND target = ?",
+                    (word, backend, target)
+                )
+                self._count -= 1
+                return None
+            # Время доступа обновляем пачками, чтобы чтение не превращалось в запись
+            self._touched[(word, backend, target)] = time.time()
+            if len(self._touched) >= 256:
+                self._flush_touched()
+            return translation
+
+    def put(self, word: str, backend: str, target: str, translation: str):
+        self.put_many([(word, translation)], backend, target)
+
+    def put_many(self, items: Iterable[Tuple[str, str]], backend: str, target: str):
+        """Сохраняет пары (слово, перевод) одной транзакцией"""
+        now = time.time()
+        rows = [(word, backend, target, translation, now, now) for word, translation in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO word_translations "
+                    "(word, backend, target, translation, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+            # INSERT OR REPLACE не различает вставку и замену, поэтому счётчик приблизительный
+            self._count += self._conn.total_changes - before
+            if self._count > self.max_entries:
+                self._evict()
+
+    def _flush_touched(self):
+        if not self._touched:
+            return
+        self._conn.executemany(
+            "UPDATE word_translations SET accessed_at = ? "
+            "WHERE word = ? AND backend = ? AND target = ?",
+            [(accessed_at,) + key for key, accessed_at in self._touched.items()]
+        )
+        self._touched.clear()
+
+    def _evict(self):
+        """Удаляет устаревшие записи и вытесняет давно не использованные до 90% лимита"""
+        self._flush_touched()
+        self._conn.execute(
+            "DELETE FROM word_translations WHERE created_at < ?",
+            (self._expiry_threshold(),)
+        )
+        count = self._conn.execute("SELECT COUNT(*) FROM word_translations").fetchone()[0]
+        keep = int(self.max_entries * 0.9)
+        if count > keep:
+            self._conn.execute(
+                "DELETE FROM word_translations WHERE (word, backend, target) IN ("
+                " SELECT word, backend, target FROM word_translations"
+                " ORDER BY accessed_at LIMIT ?)",
+                (count - keep,)
+            )
+            count = keep
+        self._count = count
+
+    def preload(self, backend: str, target: str, limit: Optional[int] = None) -> Dict[str, str]:
+        """Массовая загрузка актуальных записей для бэкенда, самые свежие — первыми"""
+        query = ("SELECT word, translation FROM word_translations "
+                 "WHERE backend = ? AND target = ? AND created_at >= ? "
+                 "ORDER BY accessed_at DESC")
+        params = [backend, target, self._expiry_threshold()]
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return dict(self._conn.execute(query, params).fetchall())
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM word_translations WHERE created_at < ?",
+                (self._expiry_threshold(),)
+            )
+            self._count -= cursor.rowcount
+            return cursor.rowcount
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self):
+        with self._lock:
+            try:
+                self._flush_touched()
+            finally:
+                self._conn.close()
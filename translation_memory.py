@@ -0,0 +1,80 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+# Типографские варианты кавычек и тире приводятся к простым
+_PUNCTUATION_TABLE = str.maketrans({
+    '«': '"', '»': '"', '„': '"', '“': '"', '”': '"',
+    '‘': "'", '’': "'",
+    '—': '-', '–': '-',
+    ' ': ' ',
+})
+_SPACE_BEFORE_PUNCTUATION = re.compile(r'\s+([?!.,;:])')
+_REPEATED_PUNCTUATION = re.compile(r'([?!.,;:])\1+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sentence(sentence: str) -> str:
+    """Ключ предложения: регистр, пробелы и пунктуация приведены к одному виду"""
+    text = sentence.translate(_PUNCTUATION_TABLE).lower()
+    text = _WHITESPACE.sub(' ', text).strip()
+    text = _SPACE_BEFORE_PUNCTUATION.sub(r'\1', text)
+    return _REPEATED_PUNCTUATION.sub(r'\1', text)
+
+
+class TranslationMemory:
+    """Память переводов предложений с вытеснением по LRU
+
+    Ключ — нормализованный текст и штамп версии правил. При появлении
+    нового штампа все записи со старым удаляются: они уже не могут
+    совпасть ни с одним запросом.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._stamp: Optional[str] = None
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _check_stamp(self, stamp: str):
+        if stamp != self._stamp:
+            self._entries.clear()
+            self._stamp = stamp
+
+    def get(self, sentence: str, stamp: str) -> Optional[Dict]:
+        key = normalize_sentence(sentence)
+        with self._lock:
+            self._check_stamp(stamp)
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Копия с исходным текстом запроса: ключ совпадает лишь после нормализации
+        return dict(result, original=sentence)
+
+    def put(self, sentence: str, stamp: str, result: Dict):
+        if self.max_entries <= 0:
+            return
+        key = normalize_sentence(sentence)
+        with self._lock:
+            self._check_stamp(stamp)
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
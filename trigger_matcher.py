@@ -0,0 +1,124 @@
+import re
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+class AhoCorasick:
+    """Автомат Ахо — Корасик: все вхождения набора строк за один проход
+
+    Время поиска зависит от длины текста и числа найденных вхождений,
+    но не от числа строк в наборе.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[int, ...]] = [()]
+        for keyword in keywords:
+            self._add(keyword)
+        self._build_links()
+
+    def _add(self, keyword: str):
+        state = 0
+        for char in keyword:
+            following = self._goto[state].get(char)
+            if following is None:
+                following = len(self._goto)
+                self._goto[state][char] = following
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = following
+        self._output[state] += (len(self.keywords),)
+        self.keywords.append(keyword)
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in self._goto[state].items():
+                queue.append(following)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[following] = target if target != following else 0
+                self._output[following] += self._output[self._fail[following]]
+
+    def find(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Пары (номер строки набора, позиция конца вхождения)"""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for keyword in output[state]:
+                yield keyword, position + 1
+
+
+class TriggerMatcher:
+    """Поиск триггеров всех расширенных шаблонов за один проход
+
+    Приоритет шаблона — его порядок в JSON. Литеральные trigger_verbs
+    ищутся автоматом Ахо — Корасик (как подстроки, без учёта границ слов),
+    trigger_regex объединены в одно выражение из опережающих проверок: оно
+    проходит по всем позициям, где совпадает хоть одно выражение, но
+    называет только самый приоритетный шаблон. Менее приоритетные
+    выражения, ещё не найденные, проверяются отдельно на этих же позициях.
+    Перед объединённым выражением работает простая альтернатива тех же
+    выражений: она быстро отсекает предложения без триггеров и находит
+    позицию, с которой начинать.
+    """
+
+    def __init__(self, extended_patterns: Dict):
+        self.names: List[str] = []
+        literals = []
+        self._literal_priority: List[int] = []
+        regex_parts = []
+        for priority, (name, config) in enumerate(extended_patterns.items()):
+            self.names.append(name)
+            if config.get("trigger_regex"):
+                regex_parts.append((priority, config["trigger_regex"]))
+            for verb in config.get("trigger_verbs", ()):
+                literals.append(verb)
+                self._literal_priority.append(priority)
+        self._automaton = AhoCorasick(literals) if literals else None
+
+        self._regex = None
+        self._gate = None
+        self._separate: List[Tuple[int, re.Pattern]] = []
+        # Те же выражения по отдельности — для проверки на найденных позициях
+        self._each: List[Tuple[int, re.Pattern]] = []
+        if regex_parts:
+            try:
+                self._gate = re.compile("|".join(f"(?:{regex})" for _, regex in regex_parts))
+                self._regex = re.compile("|".join(f"(?=(?P<t{priority}>{regex}))"
+                                                  for priority, regex in regex_parts))
+                self._each = [(priority, re.compile(regex)) for priority, regex in regex_parts]
+            except re.error:
+                # Выражения с собственными флагами или именованными группами не объединяются
+                self._gate = self._regex = None
+                self._each = []
+                self._separate = [(priority, re.compile(regex)) for priority, regex in regex_parts]
+
+    def match(self, text: str) -> List[str]:
+        """Имена шаблонов, чьи триггеры есть в тексте, по убыванию приоритета"""
+        found = set()
+        first = self._gate.search(text) if self._gate is not None else None
+        if first is not None:
+            for match in self._regex.finditer(text, first.start()):
+                top = int(match.lastgroup[1:])
+                found.add(top)
+                # На этой же позиции могут совпасть и менее приоритетные выражения
+                for priority, regex in self._each:
+                    if priority > top and priority not in found and regex.match(text, match.start()):
+                        found.add(priority)
+        for priority, regex in self._separate:
+            if regex.search(text):
+                found.add(priority)
+        if self._automaton is not None:
+            for keyword, _ in self._automaton.find(text):
+                found.add(self._literal_priority[keyword])
+        return [self.names[priority] for priority in sorted(found)]